@@ -0,0 +1,330 @@
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Dict
+
+import uvicorn
+from fastapi import FastAPI, Request, Response
+
+# Local stand-in for the BIG-IP iControl REST endpoints used by server.py.
+# Payloads are generated once at startup; every response sleeps --latency-ms first.
+
+def build_config(args) -> Dict[str, Any]:
+    return {
+        "latency": args.latency_ms / 1000.0,
+        "virtuals": args.virtuals,
+        "pools": args.pools,
+        "members": args.members_per_pool,
+        "certs": args.certs,
+        "log_lines": args.log_lines,
+    }
+
+def _member(p: int, m: int) -> dict:
+    address = f"10.{p // 250}.{p % 250}.{m + 1}"
+    return {
+        "kind": "tm:ltm:pool:members:membersstate",
+        "name": f"{address}:80",
+        "partition": "Common",
+        "fullPath": f"/Common/{address}:80",
+        "generation": 1,
+        "selfLink": f"https://localhost/mgmt/tm/ltm/pool/~Common~pool{p}/members/~Common~{address}:80",
+        "address": address,
+        "session": "user-disabled" if m == 0 and p % 10 == 0 else "monitor-enabled",
+        "state": "down" if m == 1 and p % 7 == 0 else "up",
+    }
+
+def build_payloads(cfg: dict) -> Dict[str, Any]:
+    now = int(time.time())
+    pools = []
+    for p in range(cfg["pools"]):
+        pools.append({
+            "kind": "tm:ltm:pool:poolstate",
+            "name": f"pool{p}",
+            "partition": "Common",
+            "fullPath": f"/Common/pool{p}",
+            "generation": 1,
+            "selfLink": f"https://localhost/mgmt/tm/ltm/pool/~Common~pool{p}",
+            "loadBalancingMode": "round-robin",
+            "monitor": "/Common/http",
+            "membersReference": {
+                "link": f"https://localhost/mgmt/tm/ltm/pool/~Common~pool{p}/members",
+                "isSubcollection": True,
+                "items": [_member(p, m) for m in range(cfg["members"])],
+            },
+        })
+    virtuals = []
+    for v in range(cfg["virtuals"]):
+        virtuals.append({
+            "kind": "tm:ltm:virtual:virtualstate",
+            "name": f"vs{v}",
+            "partition": "Common",
+            "fullPath": f"/Common/vs{v}",
+            "generation": 1,
+            "selfLink": f"https://localhost/mgmt/tm/ltm/virtual/~Common~vs{v}",
+            "destination": f"/Common/192.168.{v // 250}.{v % 250}:443",
+            "ipProtocol": "tcp",
+            "mask": "255.255.255.255",
+            "pool": f"/Common/pool{v % max(cfg['pools'], 1)}" if cfg["pools"] else None,
+            "source": "0.0.0.0/0",
+            "sourceAddressTranslation": {"type": "automap"},
+            "profilesReference": {"link": f"https://localhost/mgmt/tm/ltm/virtual/~Common~vs{v}/profiles", "isSubcollection": True},
+        })
+    certs = []
+    for c in range(cfg["certs"]):
+        certs.append({
+            "kind": "tm:sys:crypto:cert:certstate",
+            "name": f"cert{c}.crt",
+            "partition": "Common",
+            "fullPath": f"/Common/cert{c}.crt",
+            "generation": 1,
+            "selfLink": f"https://localhost/mgmt/tm/sys/crypto/cert/~Common~cert{c}.crt",
+            "commonName": f"app{c}.example.com",
+            "subject": f"CN=app{c}.example.com,O=Example",
+            "subjectAlternativeName": f"DNS:app{c}.example.com, DNS:www.app{c}.example.com",
+            "expirationDate": now + (c % 400 - 20) * 86400,
+            "expirationString": time.strftime("%b %d %H:%M:%S %Y GMT", time.gmtime(now + (c % 400 - 20) * 86400)),
+            "keyType": "rsa-public",
+            "keySize": 2048,
+        })
+    stat = lambda v: {"value": v}
+    traffic = {"entries": {"https://localhost/mgmt/tm/sys/tmm-traffic/0": {"nestedStats": {"entries": {
+        "clientside.curConns": stat(1200), "clientside.totConns": stat(987654),
+        "clientside.bitsIn": stat(123456789), "clientside.bitsOut": stat(987654321),
+        "serverside.curConns": stat(1100), "serverside.totConns": stat(876543),
+    }}}}}
+    tmm = {"entries": {f"https://localhost/mgmt/tm/sys/tmm-info/0.{i}/stats": {"nestedStats": {"entries": {
+        "tmmId": {"description": f"0.{i}"}, "fiveSecAvgUsageRatio": stat(20 + i), "oneMinAvgUsageRatio": stat(18 + i),
+    }}} for i in range(4)}}
+    cpu = {"kind": "tm:sys:cpu:cpustats", "entries": {f"https://localhost/mgmt/tm/sys/cpu/{i}": {"nestedStats": {"entries": {
+        "cpuId": stat(i), "fiveSecAvgUser": stat(12), "fiveSecAvgSystem": stat(4), "fiveSecAvgIdle": stat(84),
+    }}} for i in range(8)}}
+    log_text = "\n".join(
+        f"{time.strftime('%b %d %H:%M:%S', time.localtime(now - cfg['log_lines'] + i))} bigip1 "
+        f"{('warning', 'info', 'err', 'notice')[i % 4]} tmm[1234]: 01070638:5: Pool /Common/pool{i % 50} member 10.0.0.{i % 200}:80 monitor status {('down', 'up')[i % 2]}."
+        for i in range(cfg["log_lines"])
+    )
+    return {
+        "pools": pools,
+        "virtuals": virtuals,
+        "certs": certs,
+        "traffic": json.dumps(traffic).encode(),
+        "tmm": json.dumps(tmm).encode(),
+        "cpu": json.dumps(cpu).encode(),
+        "connections": json.dumps({"kind": "tm:sys:performance:connections:connectionsstats", "entries": traffic["entries"]}).encode(),
+        "log": json.dumps({"kind": "tm:sys:log:ltm:ltmstats", "apiRawValues": {"apiAnonymous": log_text}}).encode(),
+    }
+
+def _json(body) -> Response:
+    return Response(content=body if isinstance(body, bytes) else json.dumps(body).encode(), media_type="application/json")
+
+def _without_subcollection_items(item: dict) -> dict:
+    ref = item.get("membersReference")
+    if not ref:
+        return item
+    return dict(item, membersReference={"link": ref["link"], "isSubcollection": True})
+
+def _collection(kind: str, items: list, request: Request) -> Response:
+    q = request.query_params
+    if q.get("$filter", "").startswith("partition eq "):
+        partition = q["$filter"][len("partition eq "):]
+        items = [i for i in items if i.get("partition") == partition]
+    if q.get("expandSubcollections") != "true":
+        items = [_without_subcollection_items(i) for i in items]
+    if "$select" in q:
+        fields = q["$select"].split(",")
+        items = [{k: i[k] for k in fields if k in i} for i in items]
+    body: Dict[str, Any] = {"kind": kind}
+    if "$top" in q:
+        top, skip = int(q["$top"]), int(q.get("$skip", 0))
+        body.update({"totalItems": len(items), "currentItemCount": len(items[skip:skip + top])})
+        items = items[skip:skip + top]
+    body["items"] = items
+    return _json(body)
+
+def ltm_path(name: str) -> str:
+    return name if name.startswith("/") else f"/Common/{name}"
+
+def create_app(cfg: dict) -> FastAPI:
+    app = FastAPI()
+    data = build_payloads(cfg)
+    pools_by_name = {p["name"]: p for p in data["pools"]}
+    counters = {"requests": 0, "logins": 0}
+
+    @app.middleware("http")
+    async def latency(request: Request, call_next):
+        counters["requests"] += 1
+        if cfg["latency"]:
+            await asyncio.sleep(cfg["latency"])
+        return await call_next(request)
+
+    @app.post("/mgmt/shared/authn/login")
+    async def login(request: Request):
+        counters["logins"] += 1
+        body = await request.json()
+        return {"username": body.get("username"), "token": {"token": f"mock-token-{counters['logins']}", "timeout": 1200}}
+
+    @app.get("/mock/counters")
+    async def mock_counters():
+        return counters
+
+    @app.get("/mgmt/tm/ltm/virtual")
+    async def virtuals(request: Request):
+        return _collection("tm:ltm:virtual:virtualcollectionstate", data["virtuals"], request)
+
+    @app.get("/mgmt/tm/ltm/pool")
+    async def pools(request: Request):
+        return _collection("tm:ltm:pool:poolcollectionstate", data["pools"], request)
+
+    @app.post("/mgmt/tm/ltm/pool")
+    async def create_pool(request: Request):
+        body = await request.json()
+        pool = {"kind": "tm:ltm:pool:poolstate", "name": body["name"], "partition": body.get("partition", "Common"),
+                "fullPath": f"/{body.get('partition', 'Common')}/{body['name']}", "generation": 2,
+                "membersReference": {"link": "", "isSubcollection": True, "items": [
+                    dict(m, state="unchecked", session="user-enabled", fullPath=f"/Common/{m['name']}") for m in body.get("members", [])]}}
+        if body["name"] in pools_by_name:
+            return Response(status_code=409, content=json.dumps({"code": 409, "message": "already exists"}), media_type="application/json")
+        pools_by_name[body["name"]] = pool
+        data["pools"].append(pool)
+        return {k: v for k, v in pool.items() if k != "membersReference"}
+
+    @app.delete("/mgmt/tm/ltm/pool/{pool_id}")
+    async def delete_pool(pool_id: str):
+        pool = pools_by_name.pop(pool_id.split("~")[-1], None)
+        if not pool:
+            return Response(status_code=404, content=json.dumps({"code": 404, "message": "not found"}), media_type="application/json")
+        data["pools"].remove(pool)
+        return Response(status_code=200)
+
+    @app.post("/mgmt/tm/ltm/virtual")
+    async def create_virtual(request: Request):
+        body = await request.json()
+        if any(v["name"] == body["name"] for v in data["virtuals"]):
+            return Response(status_code=409, content=json.dumps({"code": 409, "message": "already exists"}), media_type="application/json")
+        virtual = {"kind": "tm:ltm:virtual:virtualstate", "name": body["name"], "partition": "Common",
+                   "fullPath": f"/Common/{body['name']}", "generation": 2, "destination": f"/Common/{body['destination']}",
+                   "ipProtocol": body.get("ipProtocol", "tcp"), "pool": ltm_path(body["pool"]) if body.get("pool") else None}
+        data["virtuals"].append(virtual)
+        return virtual
+
+    @app.get("/mgmt/tm/ltm/virtual/{virtual_id}")
+    async def virtual(virtual_id: str):
+        name = virtual_id.split("~")[-1]
+        for v in data["virtuals"]:
+            if v["name"] == name:
+                return _json(v)
+        return Response(status_code=404, content=json.dumps({"code": 404, "message": "not found"}), media_type="application/json")
+
+    @app.delete("/mgmt/tm/ltm/virtual/{virtual_id}")
+    async def delete_virtual(virtual_id: str):
+        name = virtual_id.split("~")[-1]
+        kept = [v for v in data["virtuals"] if v["name"] != name]
+        if len(kept) == len(data["virtuals"]):
+            return Response(status_code=404, content=json.dumps({"code": 404, "message": "not found"}), media_type="application/json")
+        data["virtuals"][:] = kept
+        return Response(status_code=200)
+
+    @app.get("/mgmt/tm/ltm/pool/{pool_id}/members/stats")
+    async def member_stats(pool_id: str):
+        pool = pools_by_name.get(pool_id.split("~")[-1])
+        if not pool:
+            return Response(status_code=404, content=json.dumps({"code": 404, "message": "not found"}), media_type="application/json")
+        entries = {}
+        for m in pool["membersReference"]["items"]:
+            addr, port = m["name"].rsplit(":", 1)
+            entries[m["selfLink"] + "/stats"] = {"nestedStats": {"entries": {
+                "addr": {"description": addr}, "port": {"value": int(port)},
+                "status.availabilityState": {"description": "available" if m["state"] == "up" else "offline"},
+                "serverside.curConns": {"value": 12}, "serverside.totConns": {"value": 3456},
+                "serverside.bitsIn": {"value": 1234567}, "serverside.bitsOut": {"value": 7654321},
+            }}}
+        return {"kind": "tm:ltm:pool:members:membersstats", "entries": entries}
+
+    @app.get("/mgmt/tm/ltm/pool/{pool_id}/members")
+    async def members(pool_id: str, request: Request):
+        pool = pools_by_name.get(pool_id.split("~")[-1])
+        if not pool:
+            return Response(status_code=404, content=json.dumps({"code": 404, "message": "not found"}), media_type="application/json")
+        return _collection("tm:ltm:pool:members:memberscollectionstate", pool["membersReference"]["items"], request)
+
+    @app.post("/mgmt/tm/ltm/pool/{pool_id}/members")
+    async def member_create(pool_id: str, request: Request):
+        pool = pools_by_name.get(pool_id.split("~")[-1])
+        if not pool:
+            return Response(status_code=404, content=json.dumps({"code": 404, "message": "not found"}), media_type="application/json")
+        body = json.loads(await request.body() or b"{}")
+        name = body["name"].split("/")[-1]
+        member = {
+            "kind": "tm:ltm:pool:members:membersstate", "name": name, "partition": "Common",
+            "fullPath": f"/Common/{name}", "generation": 1,
+            "selfLink": f"https://localhost/mgmt/tm/ltm/pool/~Common~{pool['name']}/members/~Common~{name}",
+            "address": body.get("address") or name.rsplit(":", 1)[0], "session": "monitor-enabled", "state": "up",
+        }
+        # Like member DELETE, the pool generation is left alone
+        pool["membersReference"]["items"].append(member)
+        return member
+
+    @app.api_route("/mgmt/tm/ltm/pool/{pool_id}/members/{member_id}", methods=["PUT", "PATCH", "DELETE"])
+    async def member_update(pool_id: str, member_id: str, request: Request):
+        name = member_id.split("~")[-1]
+        pool = pools_by_name.get(pool_id.split("~")[-1])
+        if request.method == "DELETE" and pool:
+            # The pool generation is left alone: only a membership re-list sees the change
+            items = pool["membersReference"]["items"]
+            items[:] = [m for m in items if m["name"] != name]
+        return {"name": name}
+
+    @app.post("/mgmt/tm/transaction")
+    async def transaction_create():
+        counters["transactions"] = counters.get("transactions", 0) + 1
+        return {"transId": 1000 + counters["transactions"], "state": "STARTED"}
+
+    @app.api_route("/mgmt/tm/transaction/{trans_id}", methods=["PATCH", "DELETE"])
+    async def transaction_commit(trans_id: int, request: Request):
+        if request.method == "DELETE":
+            return Response(status_code=200)
+        return {"transId": trans_id, "state": "COMPLETED"}
+
+    @app.get("/mgmt/tm/sys/crypto/cert")
+    async def certs(request: Request):
+        return _collection("tm:sys:crypto:cert:certcollectionstate", data["certs"], request)
+
+    @app.get("/mgmt/tm/sys/cpu")
+    async def cpu():
+        return _json(data["cpu"])
+
+    @app.get("/mgmt/tm/sys/tmm-info")
+    @app.get("/mgmt/tm/sys/tmm-info/stats")
+    async def tmm_info():
+        return _json(data["tmm"])
+
+    @app.get("/mgmt/tm/sys/tmm-traffic/stats")
+    async def tmm_traffic():
+        return _json(data["traffic"])
+
+    @app.get("/mgmt/tm/sys/performance/connections/stats")
+    async def connections():
+        return _json(data["connections"])
+
+    @app.get("/mgmt/tm/sys/log/ltm/stats")
+    async def ltm_log():
+        return _json(data["log"])
+
+    return app
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Added latency per device request")
+    parser.add_argument("--virtuals", type=int, default=5000)
+    parser.add_argument("--pools", type=int, default=500)
+    parser.add_argument("--members-per-pool", type=int, default=4)
+    parser.add_argument("--certs", type=int, default=1000)
+    parser.add_argument("--log-lines", type=int, default=2000)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock BIG-IP iControl REST server for benchmarks")
+    parser.add_argument("--port", type=int, default=8443)
+    add_arguments(parser)
+    args = parser.parse_args()
+    print(f"OK, mock BIG-IP running on port {args.port}")
+    uvicorn.run(create_app(build_config(args)), host="127.0.0.1", port=args.port, log_level="warning")
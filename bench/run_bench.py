@@ -0,0 +1,185 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+import mock_bigip
+
+# Drives server.py (/mcp/invoke and JSON-RPC /) against mock_bigip.py at several
+# concurrency levels and reports latency percentiles, throughput and server RSS.
+#
+#   python bench/run_bench.py --concurrency 1,8,32 --requests 200 | tee bench_output.txt
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_PY = os.path.join(BENCH_DIR, "..", "server.py")
+
+def scenarios(cache: bool) -> List[dict]:
+    extra = {} if cache else {"bypass_cache": True}
+    return [
+        {"name": "getCpuStat", "tool": "getCpuStat", "args": dict(extra)},
+        {"name": "getConnection", "tool": "getConnection", "args": {}},
+        {"name": "getPoolMemberStatus", "tool": "getPoolMemberStatus", "args": {"pool_name": "pool1"}},
+        {"name": "listAllVirtual(full)", "tool": "listAllVirtual", "args": dict(extra)},
+        {"name": "listAllVirtual(page)", "tool": "listAllVirtual", "args": dict(extra, fields=["name", "destination", "pool"], top=50)},
+        {"name": "listAllVirtual(table)", "tool": "listAllVirtual", "args": dict(extra, format="table")},
+        {"name": "getCertificateStat", "tool": "getCertificateStat", "args": dict(extra)},
+        {"name": "getAllPoolMemberStatus", "tool": "getAllPoolMemberStatus", "args": {"only_down": True}},
+        {"name": "getLtmLogs(filtered)", "tool": "getLtmLogs", "args": {"start_time": "2026-01-01:00:00:00", "end_time": "now", "severity": "err", "max_lines": 100}},
+    ]
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_for_port(port: int, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as s:
+            if s.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.1)
+    raise RuntimeError(f"Port {port} did not open within {timeout}s")
+
+def rss_mb(pid: int) -> Optional[float]:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        out = subprocess.run(["ps", "-o", "rss=", "-p", str(pid)], capture_output=True, text=True).stdout.strip()
+        return int(out) / 1024 if out else None
+    except (OSError, ValueError):
+        return None
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    k = (len(sorted_values) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+def build_request(transport: str, scenario: dict, creds: dict, seq: int):
+    args = dict(creds, **scenario["args"])
+    if transport == "invoke":
+        return "/mcp/invoke", {"name": scenario["tool"], "arguments": args}
+    return "/", {"jsonrpc": "2.0", "id": seq, "method": "tools/call", "params": {"name": scenario["tool"], "arguments": args}}
+
+async def run_level(client: httpx.AsyncClient, transport: str, scenario: dict, creds: dict, concurrency: int, requests: int) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    sent = 0
+    response_bytes = 0
+
+    async def worker():
+        nonlocal sent, errors, response_bytes
+        while sent < requests:
+            sent += 1
+            path, body = build_request(transport, scenario, creds, sent)
+            started = time.perf_counter()
+            try:
+                resp = await client.post(path, json=body)
+                ok = resp.status_code == 200 and "error" not in resp.json()
+                response_bytes += len(resp.content)
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "scenario": scenario["name"],
+        "transport": transport,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+        "avg_response_kb": round(response_bytes / max(len(latencies), 1) / 1024, 1),
+    }
+
+async def run_all(args, server_port: int, mock_port: int, server_pid: int) -> List[dict]:
+    creds = {"f5_url": f"http://127.0.0.1:{mock_port}", "f5_username": "admin", "f5_password": "admin"}
+    selected = [s for s in scenarios(not args.no_cache) if not args.scenario or s["name"] in args.scenario or s["tool"] in args.scenario]
+    limits = httpx.Limits(max_connections=max(args.concurrency) * 2, max_keepalive_connections=max(args.concurrency) * 2)
+    results = []
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{server_port}", timeout=120.0, limits=limits) as client:
+        for scenario in selected:
+            # Warm up: token login, connection pool, first parse
+            path, body = build_request("invoke", scenario, creds, 0)
+            await client.post(path, json=body)
+            for transport in args.transport:
+                for concurrency in args.concurrency:
+                    row = await run_level(client, transport, scenario, creds, concurrency, args.requests)
+                    row["rss_mb"] = round(rss_mb(server_pid) or 0.0, 1)
+                    results.append(row)
+                    print_row(row, args.json)
+    return results
+
+COLUMNS = ("scenario", "transport", "concurrency", "requests", "errors", "rps", "p50_ms", "p95_ms", "p99_ms", "avg_response_kb", "rss_mb")
+
+def print_header(as_json: bool):
+    if not as_json:
+        print(f"{'scenario':<24}{'transport':>10}{'conc':>6}{'reqs':>6}{'err':>5}{'rps':>9}{'p50ms':>9}{'p95ms':>9}{'p99ms':>9}{'respKB':>9}{'rssMB':>8}")
+
+def print_row(row: dict, as_json: bool):
+    if as_json:
+        print(json.dumps(row), flush=True)
+        return
+    print(f"{row['scenario']:<24}{row['transport']:>10}{row['concurrency']:>6}{row['requests']:>6}{row['errors']:>5}"
+          f"{row['rps']:>9}{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}{row['avg_response_kb']:>9}{row['rss_mb']:>8}", flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark server.py against a local mock BIG-IP")
+    parser.add_argument("--concurrency", type=lambda v: [int(x) for x in v.split(",")], default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario, transport and concurrency level")
+    parser.add_argument("--transport", type=lambda v: v.split(","), default=["invoke", "jsonrpc"], help="invoke,jsonrpc")
+    parser.add_argument("--scenario", action="append", help="Only run this scenario or tool (repeatable)")
+    parser.add_argument("--no-cache", action="store_true", help="Pass bypass_cache to tools that support it")
+    parser.add_argument("--server-log", action="store_true", help="Keep server.py logging on (it is sent to stderr)")
+    parser.add_argument("--json", action="store_true", help="Print one JSON object per result row")
+    mock_bigip.add_arguments(parser)
+    args = parser.parse_args()
+
+    mock_port, server_port = free_port(), free_port()
+    mock_cmd = [sys.executable, os.path.join(BENCH_DIR, "mock_bigip.py"), "--port", str(mock_port),
+                "--latency-ms", str(args.latency_ms), "--virtuals", str(args.virtuals), "--pools", str(args.pools),
+                "--members-per-pool", str(args.members_per_pool), "--certs", str(args.certs), "--log-lines", str(args.log_lines)]
+    server_out = None if args.server_log else subprocess.DEVNULL
+    procs = []
+    try:
+        procs.append(subprocess.Popen(mock_cmd, stdout=subprocess.DEVNULL))
+        procs.append(subprocess.Popen([sys.executable, SERVER_PY, "--port", str(server_port)], stdout=subprocess.DEVNULL, stderr=server_out))
+        wait_for_port(mock_port)
+        wait_for_port(server_port)
+        if not args.json:
+            print(f"mock: {args.virtuals} virtuals, {args.pools} pools x {args.members_per_pool} members, {args.certs} certs, "
+                  f"{args.latency_ms:g} ms latency; server RSS at start {rss_mb(procs[1].pid) or 0:.1f} MB")
+        print_header(args.json)
+        asyncio.run(run_all(args, server_port, mock_port, procs[1].pid))
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.wait(timeout=10)
+
+if __name__ == "__main__":
+    main()
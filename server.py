@@ -1,31 +1,198 @@
 import argparse
 import asyncio
+import atexit
 import base64
+import bisect
+import contextvars
+import csv
+import fnmatch
+import hashlib
+import io
 import json
 import logging
+import logging.handlers
+import math
 import os
+import queue
+import random
+import re
+import secrets
+import sqlite3
 import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from abc import ABC, abstractmethod
+from array import array
+from datetime import datetime
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
 from typing import Any, Dict, List, Optional, Union, Callable
 
 import httpx
 import uvicorn
 from fastapi import FastAPI, Request, Response
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 
+try:
+    import orjson  # optional: faster JSON parsing/serialization
+except ImportError:
+    orjson = None
+
 # ===== Configuration =====
 # Toggle these to enable/disable logs
 ENABLE_CLIENT_LOG = True
 ENABLE_F5_LOG = True
+LOG_BODY_MAX_BYTES = 2048    # logged request/response bodies are truncated to this size
+LOG_BODY_SAMPLE_RATE = 1.0   # fraction of log records that include the body
+LOG_QUEUE_SIZE = 10000       # records beyond this backlog are dropped, never block the event loop
+
+# F5 connection pool: one long-lived client per device, reused across tool calls
+F5_TIMEOUT = 30.0
+F5_POOL_MAX_CONNECTIONS = 20
+F5_POOL_MAX_KEEPALIVE = 10
+F5_KEEPALIVE_EXPIRY = 30.0
+F5_CLIENT_IDLE_TTL = 300.0  # close a device client after this many idle seconds
+
+# F5 token auth: log in once per device/user and reuse the X-F5-Auth-Token
+F5_LOGIN_PROVIDER = "tmos"
+F5_TOKEN_REFRESH_MARGIN = 60.0  # refresh a token this many seconds before it expires
+
+# Per-device protection for restjavad: FIFO concurrency cap, jittered retries, circuit breaker
+F5_DEVICE_MAX_CONCURRENCY = 8
+F5_RETRY_ATTEMPTS = 3             # total attempts for transient failures
+F5_RETRY_BASE_DELAY = 0.25
+F5_RETRY_MAX_DELAY = 4.0
+F5_RETRY_STATUS = (502, 503, 504)
+F5_BREAKER_THRESHOLD = 5          # consecutive transient failures that open the circuit
+F5_BREAKER_COOLDOWN = 30.0        # seconds before a single probe request is let through
+
+# Read cache for collection tools: TTL in seconds per tool, bounded LRU.
+# Writes through f5_request invalidate the cached reads of the collection they touch.
+READ_CACHE_TTLS = {
+    "listAllPoolStat": 10.0,
+    "listAllVirtual": 30.0,
+    "getCertificateStat": 300.0,
+    "getTmmInfo": 5.0,
+    "getCpuStat": 5.0,
+}
+READ_CACHE_MAX_ENTRIES = 512
+READ_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Paged list tools (fields/filter/partition/top/skip/cursor)
+LIST_DEFAULT_PAGE_SIZE = 100
+LIST_MAX_PAGE_SIZE = 1000
+
+# JSON-RPC batches: max requests from one batch dispatched at the same time
+JSONRPC_BATCH_CONCURRENCY = 8
+
+# Fleet fan-out (fleetInvoke): run one read tool across many devices
+FLEET_DEFAULT_CONCURRENCY = 10
+FLEET_MAX_CONCURRENCY = 50
+FLEET_DEFAULT_TIMEOUT = 20.0
+
+# Background stats collector (opt-in per device through registerStatsDevice)
+STATS_DEFAULT_INTERVAL = 30.0
+STATS_MIN_INTERVAL = 5.0
+STATS_RING_SIZE = 720        # samples kept per device (6 hours at the default interval)
+STATS_MAX_DEVICES = 100
+STATS_MAX_POOLS = 50         # pools whose members are sampled per device
+STATS_MAX_AUTH_FAILURES = 3  # consecutive login failures before sampling stops (each retry doubles the wait)
+
+# getLtmLogs line mode (severity/pattern/max_lines/cursor)
+LOG_DEFAULT_MAX_LINES = 200
+LOG_MAX_LINES = 5000
+
+# LTM config index (findMemberUsage, findEmptyPools, getVirtualsByPool)
+CONFIG_INDEX_TTL = 30.0            # seconds before a query triggers an incremental (generation) refresh
+CONFIG_INDEX_FULL_SYNC = 600.0     # seconds between full re-downloads
+CONFIG_INDEX_MAX_INCREMENTAL = 50  # more changed virtuals than this falls back to a full sync
+CONFIG_INDEX_MAX_DEVICES = 50
+# Check mutations (missing pool, duplicate name, destination in use...) against the config index before
+# sending them, when the device already has one; dry_run always checks. A cold or unreadable index
+# only skips the check, never the write.
+MUTATION_PREFLIGHT = True
+MUTATION_PREFLIGHT_RECHECK_AGE = 1.0   # a rejection from an index older than this is confirmed by an incremental sync first
+
+# Certificate expiry index (getExpiringCertificates, findCertificates, getCertificateCounts)
+CERT_INDEX_TTL = 300.0
+CERT_INDEX_FULL_SYNC = 3600.0
+CERT_INDEX_MAX_INCREMENTAL = 50
+CERT_INDEX_MAX_DEVICES = 50
+
+# Background jobs: mutation tools called with "async": true
+JOB_WORKERS = 4              # jobs running at once; the rest wait in queue
+JOB_MAX_JOBS = 1000          # job table bound; finished jobs are evicted first
+JOB_RESULT_TTL = 3600.0      # seconds a finished job and its result are kept
+
+# Multi-worker mode (--workers N): workers share tokens, cached reads and job records through
+# a local sqlite file. The parent sets these for its workers; leave unset for a single process.
+SHARED_STORE_PATH = os.environ.get("F5MCP_SHARED_STORE")
+SERVER_WORKERS = int(os.environ.get("F5MCP_WORKERS") or 1)
+SHARED_STORE_MAX_VALUE_BYTES = 8 * 1024 * 1024   # larger cached reads stay per worker
+JOB_CANCEL_POLL_INTERVAL = 1.0                   # how often a worker checks for cancelJob sent to another worker
+
+# Streaming (Accept: text/event-stream): keepalive comment interval while a tool runs
+SSE_KEEPALIVE_INTERVAL = 15.0
+
+# Tool results: single-line JSON instead of indent=2 for every call (per call: "format": "compact")
+TOOL_OUTPUT_COMPACT = False
+# Output format of the device-JSON tools (per call: "format"): json (raw, as before), compact or table
+TOOL_OUTPUT_DEFAULT_FORMAT = "json"
+TOOL_OUTPUT_MAX_CHARS = 32000     # budget for compact/table output (per call: "max_chars")
 
 # ===== Setup Logging =====
-logging.basicConfig(level=logging.INFO, format='%(message)s')
-logger = logging.getLogger("mcp_server")
+# Records are queued and written by a background thread so slow stderr never stalls the event loop
 
-app = FastAPI()
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+_log_queue = queue.Queue(LOG_QUEUE_SIZE)
+_log_stream_handler = logging.StreamHandler()
+_log_stream_handler.setFormatter(logging.Formatter('%(message)s'))
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_stream_handler)
+log_queue_handler = DroppingQueueHandler(_log_queue)
+logging.basicConfig(level=logging.INFO, format='%(message)s', handlers=[log_queue_handler])
+_log_listener.start()
+atexit.register(_log_listener.stop)
+logger = logging.getLogger("mcp_server")
 
 # ===== Models & Helpers =====
 
+# JSON layer: orjson when installed, stdlib otherwise. Parses bytes directly.
+def json_loads(data: Union[bytes, str]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def json_dumps_bytes(obj: Any, indent: bool = False) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0, default=str)
+        except TypeError:
+            pass  # e.g. non-str dict keys; fall through to stdlib
+    if indent:
+        return json.dumps(obj, indent=2, default=str).encode()
+    return json.dumps(obj, separators=(',', ':'), default=str).encode()
+
+def json_dumps(obj: Any, indent: bool = False) -> str:
+    return json_dumps_bytes(obj, indent).decode()
+
+def format_json(data: Any) -> str:
+    return json_dumps(data, indent=not TOOL_OUTPUT_COMPACT)
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return json_dumps_bytes(content)
+
 class Tool(BaseModel):
     name: str
     description: str
@@ -35,41 +202,751 @@ class Tool(BaseModel):
     class Config:
         arbitrary_types_allowed = True
 
-def log_request(direction: str, method: str, url: str, body: Any):
-    if not ENABLE_CLIENT_LOG and direction == "MCP": return
-    if not ENABLE_F5_LOG and direction == "F5": return
-    
-    header = f"----- {direction} REQUEST -----"
-    logger.info(f"\n{header}")
-    logger.info(f"{method} {url}")
-    if body:
-        logger.info(f"Request Body: {json.dumps(body, indent=2)}")
+def log_enabled(direction: str) -> bool:
+    if direction.startswith("F5"):
+        return ENABLE_F5_LOG
+    return ENABLE_CLIENT_LOG
+
+def _clip_for_log(value: Any, budget: list) -> Any:
+    # Copy only what fits in the preview so a large body is never serialized in full; budget[0] is characters left
+    if budget[0] <= 0:
+        return '...'
+    if isinstance(value, dict):
+        out = {}
+        for k, v in value.items():
+            if budget[0] <= 0:
+                out['...'] = f"{len(value) - len(out)} more keys"
+                break
+            budget[0] -= len(str(k)) + 4
+            out[k] = _clip_for_log(v, budget)
+        return out
+    if isinstance(value, (list, tuple)):
+        out = []
+        for v in value:
+            if budget[0] <= 0:
+                out.append(f"... {len(value) - len(out)} more items")
+                break
+            out.append(_clip_for_log(v, budget))
+        return out
+    if isinstance(value, str):
+        value = value[:budget[0]]
+    budget[0] -= len(value) + 2 if isinstance(value, str) else 8
+    return value
+
+def _body_preview(body: Any, total_size: int = None) -> str:
+    if not body:
+        return "<empty>"
+    if random.random() >= LOG_BODY_SAMPLE_RATE:
+        return "<not sampled>"
+    if isinstance(body, (bytes, bytearray)):
+        text = bytes(body[:LOG_BODY_MAX_BYTES]).decode('utf-8', errors='replace')
+        size = len(body)
+    elif isinstance(body, str):
+        text = body[:LOG_BODY_MAX_BYTES]
+        size = len(body)
     else:
-        logger.info("Request Body: <empty>")
+        clipped = _clip_for_log(body, [LOG_BODY_MAX_BYTES])
+        try:
+            text = json_dumps(clipped)
+        except Exception:
+            text = str(clipped)
+        # The full size of a clipped body is unknown without serializing it, which is what clipping avoids
+        size = None if len(text) > LOG_BODY_MAX_BYTES else len(text)
+        text = text[:LOG_BODY_MAX_BYTES]
+    if total_size is not None:
+        size = total_size
+    if size is None:
+        text += " ...<truncated>"
+    elif size > LOG_BODY_MAX_BYTES:
+        text += f" ...<truncated, {size} bytes total>"
+    return text
 
-def log_response(direction: str, status: Any, body: Any):
-    if not ENABLE_CLIENT_LOG and direction == "MCP": return
-    if not ENABLE_F5_LOG and direction == "F5": return
-    
-    logger.info(f"Response Status: {status}")
-    if body:
-        # Try to parse JSON for pretty printing
+def log_request(direction: str, method: str, url: str, body: Any):
+    if not log_enabled(direction): return
+    logger.info(f"\n----- {direction} REQUEST -----\n{method} {url}\nRequest Body: {_body_preview(body)}")
+
+def log_response(direction: str, status: Any, body: Any, total_size: int = None):
+    if not log_enabled(direction): return
+    logger.info(f"Response Status: {status}\nResponse Body: {_body_preview(body, total_size)}\n----- END {direction} REQUEST -----\n")
+
+# ===== Metrics =====
+# Minimal Prometheus text-format metrics, rendered at GET /metrics
+
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+METRICS_MAX_DEVICES = 50     # distinct device label values; further devices are counted as "other"
+
+def _metric_labels(names: tuple, values: tuple, extra: str = '') -> str:
+    parts = []
+    for n, v in zip(names, values):
+        v = str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{n}="{v}"')
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name, self.help, self.labels = name, help_text, labels
+        self.values: Dict[tuple, float] = {}
+
+    def inc(self, *labels, value: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) + value
+
+    def set(self, *labels, value: float):
+        # For counters kept elsewhere (cache, single-flight) and copied in at scrape time
+        self.values[labels] = value
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_metric_labels(self.labels, k)} {v:g}" for k, v in self.values.items()]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, value: float = 1.0):
+        self.inc(*labels, value=-value)
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = METRICS_LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help_text, labels, buckets
+        self.values: Dict[tuple, list] = {}  # labels -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, *labels):
+        v = self.values.get(labels)
+        if v is None:
+            v = self.values[labels] = [0] * len(self.buckets) + [0.0, 0]
+        for i, b in enumerate(self.buckets):
+            if value <= b:
+                v[i] += 1
+        v[-2] += value
+        v[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = []
+        for k, v in self.values.items():
+            for i, b in enumerate(self.buckets):
+                le = 'le="%g"' % b
+                lines.append(f"{self.name}_bucket{_metric_labels(self.labels, k, le)} {v[i]}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_metric_labels(self.labels, k, le)} {v[-1]}")
+            lines.append(f"{self.name}_sum{_metric_labels(self.labels, k)} {v[-2]:.6f}")
+            lines.append(f"{self.name}_count{_metric_labels(self.labels, k)} {v[-1]}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: List[Any] = []
+        self.collectors: List[Callable[[], None]] = []  # refresh point-in-time gauges before rendering
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        for collect in self.collectors:
+            collect()
+        out = []
+        for m in self.metrics:
+            out.append(f"# HELP {m.name} {m.help}")
+            out.append(f"# TYPE {m.name} {m.kind}")
+            out.extend(m.render())
+        return '\n'.join(out) + '\n'
+
+metrics = MetricsRegistry()
+mcp_tool_calls = metrics.add(Counter("mcp_tool_calls_total", "MCP tool calls by outcome", ("tool", "transport", "outcome")))
+mcp_tool_duration = metrics.add(Histogram("mcp_tool_duration_seconds", "MCP tool call latency", ("tool",)))
+mcp_tools_in_flight = metrics.add(Gauge("mcp_tools_in_flight", "MCP tool calls currently running"))
+mcp_jsonrpc_requests = metrics.add(Counter("mcp_jsonrpc_requests_total", "JSON-RPC requests by method", ("method",)))
+mcp_jobs = metrics.add(Gauge("mcp_jobs", "Background jobs in the job table by status", ("status",)))
+mcp_preflight_checks = metrics.add(Counter("mcp_preflight_checks_total", "Mutation preflight checks by result", ("tool", "result")))
+mcp_requests_cancelled = metrics.add(Counter("mcp_requests_cancelled_total", "Tool calls cancelled by the client", ("reason",)))
+f5_requests = metrics.add(Counter("f5_requests_total", "iControl REST requests by device, endpoint and status", ("device", "method", "endpoint", "status")))
+f5_request_duration = metrics.add(Histogram("f5_request_duration_seconds", "iControl REST request latency", ("device", "endpoint")))
+f5_requests_in_flight = metrics.add(Gauge("f5_requests_in_flight", "iControl REST requests currently running", ("device",)))
+f5_read_cache_hits = metrics.add(Counter("f5_read_cache_hits_total", "Read cache hits"))
+f5_read_cache_misses = metrics.add(Counter("f5_read_cache_misses_total", "Read cache misses"))
+f5_read_cache_hit_ratio = metrics.add(Gauge("f5_read_cache_hit_ratio", "Read cache hits / lookups"))
+f5_read_cache_bytes = metrics.add(Gauge("f5_read_cache_bytes", "Bytes held by the read cache"))
+f5_singleflight_coalesced = metrics.add(Counter("f5_singleflight_coalesced_total", "GETs served by joining an in-flight identical request"))
+f5_device_queued = metrics.add(Gauge("f5_device_queued_requests", "Requests waiting for a per-device slot", ("device",)))
+f5_device_circuit_open = metrics.add(Gauge("f5_device_circuit_open", "1 while the device circuit breaker is open or half-open", ("device",)))
+
+def f5_endpoint_label(module: str, path: str) -> str:
+    # Collapse object names so label cardinality stays bounded
+    parts = [p for p in path.split('?')[0].split('/') if p]
+    out = [module]
+    for i, p in enumerate(parts):
+        if p.startswith('~') or (module == 'ltm' and i == 1) or (module == 'ltm' and i > 1 and p not in ('members', 'stats')):
+            out.append('*')
+        else:
+            out.append(p)
+    return '/'.join(out)
+
+_metric_devices: set = set()
+
+def f5_device_label(base_url: str) -> str:
+    # f5_url is caller-supplied: normalize it and cap the label values so /metrics stays bounded
+    device = base_url.rstrip('/').lower()
+    if device not in _metric_devices:
+        if len(_metric_devices) >= METRICS_MAX_DEVICES:
+            return "other"
+        _metric_devices.add(device)
+    return device
+
+# ===== F5 Connection Pool =====
+
+class F5ClientRegistry:
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._last_used: Dict[str, float] = {}
+        self._in_use: Dict[str, int] = {}
+        self._lock = asyncio.Lock()
+
+    async def _get(self, base_url: str) -> httpx.AsyncClient:
+        client = self._clients.get(base_url)
+        if client is not None and not client.is_closed:
+            return client
+        async with self._lock:
+            client = self._clients.get(base_url)
+            if client is None or client.is_closed:
+                client = httpx.AsyncClient(
+                    verify=False,
+                    timeout=F5_TIMEOUT,
+                    limits=httpx.Limits(
+                        max_connections=F5_POOL_MAX_CONNECTIONS,
+                        max_keepalive_connections=F5_POOL_MAX_KEEPALIVE,
+                        keepalive_expiry=F5_KEEPALIVE_EXPIRY,
+                    ),
+                )
+                self._clients[base_url] = client
+            return client
+
+    @asynccontextmanager
+    async def acquire(self, base_url: str):
+        client = await self._get(base_url)
+        self._in_use[base_url] = self._in_use.get(base_url, 0) + 1
         try:
-            if isinstance(body, str):
-                body_json = json.loads(body)
-                logger.info(f"Response Body: {json.dumps(body_json, indent=2)}")
-            else:
-                logger.info(f"Response Body: {json.dumps(body, indent=2)}")
-        except:
-            logger.info(f"Response Body: {body}")
-    else:
-        logger.info("Response Body: <empty>")
-    
-    logger.info(f"----- END {direction} REQUEST -----\n")
+            yield client
+        finally:
+            self._in_use[base_url] = self._in_use.get(base_url, 1) - 1
+            self._last_used[base_url] = time.monotonic()
+
+    async def evict_idle(self, max_idle: float = F5_CLIENT_IDLE_TTL):
+        now = time.monotonic()
+        async with self._lock:
+            for base_url in list(self._clients):
+                if self._in_use.get(base_url, 0) > 0:
+                    continue
+                if now - self._last_used.get(base_url, now) < max_idle:
+                    continue
+                client = self._clients.pop(base_url)
+                self._last_used.pop(base_url, None)
+                self._in_use.pop(base_url, None)
+                await client.aclose()
+                logger.info(f"Closed idle F5 connection pool for {base_url}")
+
+    async def run_reaper(self):
+        while True:
+            await asyncio.sleep(F5_CLIENT_IDLE_TTL / 2)
+            try:
+                await self.evict_idle()
+            except Exception as e:
+                logger.error(f"F5 client reaper error: {e}")
+
+    async def close_all(self):
+        async with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            self._last_used.clear()
+            self._in_use.clear()
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.error(f"Error closing F5 client: {e}")
+
+f5_clients = F5ClientRegistry()
+
+# ===== Shared Store =====
+# Cross-process state for --workers mode. Every method blocks on sqlite; call it through asyncio.to_thread.
+
+class SharedStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=10.0, check_same_thread=False, isolation_level=None)
+        try:
+            # Holds live device tokens
+            os.chmod(path, 0o600)
+        except OSError:
+            pass
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS tokens (key TEXT PRIMARY KEY, token TEXT NOT NULL, expires_at REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS reads (cred TEXT NOT NULL, url TEXT NOT NULL, base_url TEXT NOT NULL,
+                                              expires_at REAL NOT NULL, size INTEGER NOT NULL, value BLOB NOT NULL,
+                                              PRIMARY KEY (cred, url));
+            CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, record TEXT NOT NULL, expires_at REAL NOT NULL,
+                                             cancel_requested INTEGER NOT NULL DEFAULT 0);
+            CREATE TABLE IF NOT EXISTS generations (scope TEXT PRIMARY KEY, n INTEGER NOT NULL);
+        """)
+        self._puts = 0
+
+    def _execute(self, sql: str, args: tuple = ()) -> list:
+        with self._lock:
+            return self._db.execute(sql, args).fetchall()
+
+    # Expiry times are wall-clock: monotonic clocks are not comparable across processes
+    def get_token(self, key: tuple) -> Optional[tuple]:
+        rows = self._execute("SELECT token, expires_at FROM tokens WHERE key = ? AND expires_at > ?", (json_dumps(key), time.time()))
+        return rows[0] if rows else None
+
+    def put_token(self, key: tuple, token: str, expires_at: float):
+        self._execute("INSERT OR REPLACE INTO tokens VALUES (?, ?, ?)", (json_dumps(key), token, expires_at))
+
+    def delete_token(self, key: tuple, token: str = None):
+        if token is None:
+            self._execute("DELETE FROM tokens WHERE key = ?", (json_dumps(key),))
+        else:
+            self._execute("DELETE FROM tokens WHERE key = ? AND token = ?", (json_dumps(key), token))
+
+    def get_read(self, key: tuple, url_prefix: str) -> tuple:
+        # (collection generation, (value, size, ttl left) or None); the generation guards the later put_read
+        rows = self._execute("SELECT (SELECT n FROM generations WHERE scope = ?), value, size, expires_at FROM (SELECT 1) "
+                             "LEFT JOIN reads ON cred = ? AND url = ? AND expires_at > ?",
+                             (url_prefix, json_dumps(key[0]), key[1], time.time()))
+        generation, value, size, expires_at = rows[0]
+        if value is None:
+            return generation or 0, None
+        return generation or 0, (json_loads(value), size, expires_at - time.time())
+
+    def put_read(self, key: tuple, data: Any, size: int, ttl: float, url_prefix: str, generation: int):
+        # Dropped if any worker invalidated the collection since get_read: the body may predate that write
+        if size > SHARED_STORE_MAX_VALUE_BYTES:
+            return
+        now = time.time()
+        self._execute("INSERT OR REPLACE INTO reads SELECT ?, ?, ?, ?, ?, ? "
+                      "WHERE COALESCE((SELECT n FROM generations WHERE scope = ?), 0) = ?",
+                      (json_dumps(key[0]), key[1], key[0][0], now + ttl, size, json_dumps_bytes(data), url_prefix, generation))
+        self._puts += 1
+        if self._puts % 100 == 0:
+            self._execute("DELETE FROM reads WHERE expires_at <= ?", (now,))
+            self._execute("DELETE FROM tokens WHERE expires_at <= ?", (now,))
+            self._execute("DELETE FROM jobs WHERE expires_at <= ?", (now,))
+
+    def invalidate_reads(self, base_url: str, url_prefix: str):
+        # Bump first so a read racing this write cannot store its body after the delete
+        self._execute("INSERT INTO generations VALUES (?, 1) ON CONFLICT(scope) DO UPDATE SET n = n + 1", (url_prefix,))
+        self._execute("DELETE FROM reads WHERE base_url = ? AND substr(url, 1, length(?)) = ?", (base_url, url_prefix, url_prefix))
+
+    def put_job(self, record: dict, ttl: float):
+        self._execute("INSERT INTO jobs (id, record, expires_at) VALUES (?, ?, ?) "
+                      "ON CONFLICT(id) DO UPDATE SET record = excluded.record, expires_at = excluded.expires_at",
+                      (record['id'], json_dumps(record), time.time() + ttl))
+
+    def get_job(self, job_id: str) -> Optional[dict]:
+        rows = self._execute("SELECT record FROM jobs WHERE id = ? AND expires_at > ?", (job_id, time.time()))
+        return json_loads(rows[0][0]) if rows else None
+
+    def request_job_cancel(self, job_id: str):
+        self._execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,))
+
+    def cancel_requests(self, job_ids: List[str]) -> List[str]:
+        marks = ','.join('?' * len(job_ids))
+        return [r[0] for r in self._execute(f"SELECT id FROM jobs WHERE cancel_requested = 1 AND id IN ({marks})", tuple(job_ids))]
+
+shared_store = SharedStore(SHARED_STORE_PATH) if SHARED_STORE_PATH else None
+
+# ===== F5 Token Auth =====
+
+# Salt so credential fingerprints never expose the password; --workers passes one salt to every worker
+_CREDENTIAL_SALT = bytes.fromhex(os.environ["F5MCP_CREDENTIAL_SALT"]) if os.environ.get("F5MCP_CREDENTIAL_SALT") else os.urandom(16)
+
+def credential_key(opts: dict) -> tuple:
+    base_url = (opts.get('f5_url') or '').rstrip('/')
+    username = opts.get('f5_username') or ''
+    password = opts.get('f5_password') or ''
+    digest = hashlib.blake2b(f"{username}\0{password}".encode(), key=_CREDENTIAL_SALT, digest_size=16).hexdigest()
+    return (base_url, username, digest)
+
+class F5TokenManager:
+    def __init__(self):
+        self._tokens: Dict[tuple, tuple] = {}  # key -> (token, expires_at)
+        self._locks: Dict[tuple, asyncio.Lock] = {}
+
+    def _cached(self, key: tuple) -> Optional[str]:
+        entry = self._tokens.get(key)
+        if entry and entry[1] - F5_TOKEN_REFRESH_MARGIN > time.monotonic():
+            return entry[0]
+        return None
+
+    async def get_token(self, client: httpx.AsyncClient, key: tuple, username: str, password: str) -> str:
+        token = self._cached(key)
+        if token:
+            return token
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            token = self._cached(key)
+            if token:
+                return token
+            if shared_store:
+                # Another worker may already hold a session for these credentials
+                shared = await asyncio.to_thread(shared_store.get_token, key)
+                if shared and shared[1] - F5_TOKEN_REFRESH_MARGIN > time.time():
+                    self._tokens[key] = (shared[0], time.monotonic() + shared[1] - time.time())
+                    return shared[0]
+            token, timeout = await self._login(client, key[0], username, password)
+            self._tokens[key] = (token, time.monotonic() + timeout)
+            if shared_store:
+                await asyncio.to_thread(shared_store.put_token, key, token, time.time() + timeout)
+            return token
+
+    async def _login(self, client: httpx.AsyncClient, base_url: str, username: str, password: str):
+        url = f"{base_url}/mgmt/shared/authn/login"
+        log_request("F5 (AUTH)", "POST", url, {"username": username, "loginProviderName": F5_LOGIN_PROVIDER})
+        resp = await client.post(url, json={
+            "username": username,
+            "password": password,
+            "loginProviderName": F5_LOGIN_PROVIDER
+        })
+        log_response("F5 (AUTH)", f"{resp.status_code} {resp.reason_phrase}", None)
+        if resp.is_error:
+            raise F5APIError(resp.status_code, f"F5 login failed for user '{username}': {resp.status_code} {resp.text}")
+        token_obj = resp.json().get('token') or {}
+        token = token_obj.get('token')
+        if not token:
+            raise Exception(f"F5 login returned no token for user '{username}'")
+        return token, float(token_obj.get('timeout') or 1200)
+
+    async def invalidate(self, key: tuple, token: str = None):
+        entry = self._tokens.get(key)
+        if entry and (token is None or entry[0] == token):
+            del self._tokens[key]
+        if shared_store:
+            await asyncio.to_thread(shared_store.delete_token, key, token)
+
+f5_tokens = F5TokenManager()
+
+# ===== F5 Device Gate =====
+
+class F5APIError(Exception):
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+class F5CircuitOpenError(Exception):
+    pass
+
+class FairLimiter:
+    # Concurrency cap whose waiters are admitted strictly in arrival order
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._waiters: deque = deque()
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for f in self._waiters if not f.done())
+
+    async def acquire(self):
+        if self.active < self.limit and not self.queued:
+            self.active += 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            # The slot may have been handed over just before the cancellation landed
+            if fut.done() and not fut.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)  # hand the slot straight to the next waiter
+                return
+        self.active -= 1
+
+    async def __aenter__(self):
+        await self.acquire()
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+class DeviceGate:
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.limiter = FairLimiter(F5_DEVICE_MAX_CONCURRENCY)
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if self.probing or time.monotonic() - self.opened_at >= F5_BREAKER_COOLDOWN else "open"
+
+    def check(self) -> bool:
+        # True when the caller is the half-open probe and must settle it
+        if self.opened_at is None:
+            return False
+        remaining = F5_BREAKER_COOLDOWN - (time.monotonic() - self.opened_at)
+        if remaining <= 0 and not self.probing:
+            self.probing = True  # half-open: let one request test the device
+            return True
+        raise F5CircuitOpenError(
+            f"F5 device {self.base_url} is unavailable (circuit open after {self.failures} consecutive failures, "
+            f"retry in {max(remaining, 0):.0f}s)"
+        )
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def abandon_probe(self):
+        # The probe ended without a device verdict (cancelled, rejected credentials): admit another
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.probing or self.failures >= F5_BREAKER_THRESHOLD:
+            if self.opened_at is None or self.probing:
+                logger.warning(f"Circuit opened for F5 device {self.base_url} after {self.failures} failures")
+            self.opened_at = time.monotonic()
+        self.probing = False
+
+    def stats(self) -> dict:
+        return {
+            "active": self.limiter.active,
+            "queued": self.limiter.queued,
+            "failures": self.failures,
+            "circuit": self.state,
+        }
+
+f5_gates: Dict[str, DeviceGate] = {}
+
+def device_gate(base_url: str) -> DeviceGate:
+    gate = f5_gates.get(base_url)
+    if gate is None:
+        gate = f5_gates[base_url] = DeviceGate(base_url)
+    return gate
+
+def retry_delay(attempt: int, resp: Optional[httpx.Response] = None) -> float:
+    # Full jitter exponential backoff; a Retry-After from the device raises the floor
+    delay = random.uniform(0, min(F5_RETRY_MAX_DELAY, F5_RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+    retry_after = resp.headers.get('Retry-After') if resp is not None else None
+    if retry_after and retry_after.isdigit():
+        delay = max(delay, float(retry_after))
+    return min(delay, F5_RETRY_MAX_DELAY)
+
+# ===== F5 Read Cache =====
+
+class ReadCache:
+    def __init__(self, max_entries: int = READ_CACHE_MAX_ENTRIES, max_bytes: int = READ_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._generations: Dict[str, int] = {}  # base URL or collection prefix -> invalidation count
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def generation(self, base_url: str, url_prefix: str) -> tuple:
+        # Compared before and after a GET: a changed value means a write landed while it was in flight
+        return self._generations.get(base_url, 0), self._generations.get(url_prefix, 0)
+
+    def get(self, key: tuple):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return False, None
+        if entry[0] <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return False, None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, entry[2]
+
+    def put(self, key: tuple, value: Any, size: int, ttl: float):
+        if key in self._entries:
+            self._remove(key)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (time.monotonic() + ttl, size, value)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def invalidate(self, base_url: str, url_prefix: str = None):
+        scope = url_prefix or base_url
+        self._generations[scope] = self._generations.get(scope, 0) + 1
+        # key[0] is the credential key, whose first element is the device base URL
+        for key in [k for k in self._entries if k[0][0] == base_url]:
+            if url_prefix is None or key[1].startswith(url_prefix):
+                self._remove(key)
+
+    def _remove(self, key: tuple):
+        entry = self._entries.pop(key)
+        self._bytes -= entry[1]
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+read_cache = ReadCache()
+
+def cache_prefix(base_url: str, module: str, path: str) -> str:
+    # Writes invalidate, and reads are tracked, per collection
+    return f"{base_url}/mgmt/tm/{module}/{path.split('?')[0].lstrip('/').split('/')[0]}"
+
+# ===== F5 Single-Flight =====
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight: Dict[tuple, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: tuple, fn: Callable):
+        task = self._inflight.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            self.coalesced += 1
+        # Shield so one caller going away does not cancel the request for the others
+        return await asyncio.shield(task)
+
+    def _done(self, key: tuple, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every waiter has gone
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._inflight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+        }
+
+f5_singleflight = SingleFlight()
 
 # ===== F5 API Helpers =====
 
-async def f5_request(method: str, path: str, opts: dict, body: dict = None, is_sys: bool = False):
+async def _f5_send(client: httpx.AsyncClient, method: str, url: str, key: tuple, opts: dict, body: dict = None, extra_headers: dict = None) -> httpx.Response:
+    headers = {
+        "Content-Type": "application/json",
+        **(extra_headers or {})
+    }
+    for attempt in range(2):
+        token = await f5_tokens.get_token(client, key, opts.get('f5_username'), opts.get('f5_password'))
+        headers["X-F5-Auth-Token"] = token
+        resp = await client.request(
+            method=method,
+            url=url,
+            headers=headers,
+            json=body if body is not None else None
+        )
+        # Token expired or revoked on the device: log in again and retry once
+        if resp.status_code == 401 and attempt == 0:
+            await f5_tokens.invalidate(key, token)
+            continue
+        break
+    return resp
+
+async def _f5_fetch(method: str, url: str, path: str, opts: dict, body: dict = None, is_sys: bool = False, headers: dict = None):
+    device = f5_device_label(opts.get('f5_url'))
+    endpoint = f5_endpoint_label('sys' if is_sys else 'ltm', path)
+    f5_requests_in_flight.inc(device)
+    started = time.perf_counter()
+    status = "error"
+    try:
+        data, size, status = await _f5_fetch_inner(method, url, path, opts, body, is_sys, headers)
+        return data, size
+    except F5APIError as e:
+        status = str(e.status_code)
+        raise
+    except F5CircuitOpenError:
+        status = "circuit_open"
+        raise
+    finally:
+        f5_requests_in_flight.dec(device)
+        f5_request_duration.observe(time.perf_counter() - started, device, endpoint)
+        f5_requests.inc(device, method, endpoint, status)
+
+async def _f5_fetch_inner(method: str, url: str, path: str, opts: dict, body: dict = None, is_sys: bool = False, headers: dict = None):
+    base_url = opts.get('f5_url').rstrip('/')
+    key = credential_key(opts)
+    gate = device_gate(base_url)
+
+    log_request("F5" + (" (SYS)" if is_sys else ""), method, url, body)
+
+    async with f5_clients.acquire(base_url) as client:
+        for attempt in range(1, F5_RETRY_ATTEMPTS + 1):
+            probe = gate.check()
+            try:
+                try:
+                    async with gate.limiter:
+                        resp = await _f5_send(client, method, url, key, opts, body, headers)
+                except httpx.RequestError as e:
+                    gate.record_failure()
+                    # Connect failures never reached the device; read timeouts are only safe to repeat for GETs
+                    retryable = isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout)) or (method == 'GET' and isinstance(e, httpx.TimeoutException))
+                    if retryable and attempt < F5_RETRY_ATTEMPTS:
+                        await asyncio.sleep(retry_delay(attempt))
+                        continue
+                    logger.error(f"Underlying fetch error: {e}")
+                    raise Exception(f"fetch failed: {str(e)}")
+                if resp.status_code in F5_RETRY_STATUS:
+                    gate.record_failure()
+                    if method == 'GET' and attempt < F5_RETRY_ATTEMPTS:
+                        await asyncio.sleep(retry_delay(attempt, resp))
+                        continue
+                else:
+                    gate.record_success()
+                break
+            finally:
+                # Only a device response or a transport error settles the probe
+                if probe and gate.probing:
+                    gate.abandon_probe()
+
+    content = resp.content
+    
+    log_response("F5" + (" (SYS)" if is_sys else ""), f"{resp.status_code} {resp.reason_phrase}", content)
+    
+    if resp.is_error:
+        raise F5APIError(resp.status_code, f"F5 API {method} {path} failed: {resp.text}")
+    
+    if not content:
+        return None, 0, str(resp.status_code)
+
+    # Parse the raw bytes; no intermediate str decode
+    try:
+        return json_loads(content), len(content), str(resp.status_code)
+    except ValueError:
+        return None, 0, str(resp.status_code)
+
+async def f5_request(method: str, path: str, opts: dict, body: dict = None, is_sys: bool = False, cache_ttl: float = 0, headers: dict = None):
     f5_url = opts.get('f5_url')
     f5_username = opts.get('f5_username')
     f5_password = opts.get('f5_password')
@@ -82,43 +959,1112 @@ async def f5_request(method: str, path: str, opts: dict, body: dict = None, is_s
     base_url = f5_url.rstrip('/')
     module = 'sys' if is_sys else 'ltm'
     url = f"{base_url}/mgmt/tm/{module}{path}"
-    
-    headers = {
-        "Content-Type": "application/json"
-    }
-    
-    log_request("F5" + (" (SYS)" if is_sys else ""), method, url, body)
 
-    async with httpx.AsyncClient(verify=False, timeout=30.0) as client:
+    if method != 'GET':
         try:
-            resp = await client.request(
-                method=method,
-                url=url,
-                auth=(f5_username, f5_password),
-                headers=headers,
-                json=body if body else None
-            )
-            
-            resp_text = resp.text
-            
-            log_response("F5" + (" (SYS)" if is_sys else ""), f"{resp.status_code} {resp.reason_phrase}", resp_text)
-            
-            if resp.is_error:
-                raise Exception(f"F5 API {method} {path} failed: {resp_text}")
-            
-            if not resp_text:
+            data, _ = await _f5_fetch(method, url, path, opts, body, is_sys, headers)
+            return data
+        finally:
+            # Any write (even a failed one) may have changed the collection it touched
+            collection = path.split('?')[0].lstrip('/').split('/')[0]
+            prefix = cache_prefix(base_url, module, path)
+            read_cache.invalidate(base_url, prefix)
+            if shared_store:
+                await asyncio.to_thread(shared_store.invalidate_reads, base_url, prefix)
+            # Member state changes (PUT/PATCH on a member) leave pool membership as it was
+            if module == 'ltm' and collection in ('pool', 'virtual') and not (method in ('PUT', 'PATCH') and '/members/' in path):
+                config_index.mark_stale(base_url)
+            if module == 'sys' and collection == 'crypto':
+                cert_index.mark_dirty(base_url)
+
+    flight_key = (credential_key(opts), url)
+    # With --workers, writes made by other workers only show up in the shared table: a local entry could outlive them
+    if cache_ttl > 0 and not opts.get('bypass_cache') and not shared_store:
+        hit, data = read_cache.get(flight_key)
+        if hit:
+            return data
+
+    prefix = cache_prefix(base_url, module, path)
+    generation = read_cache.generation(base_url, prefix)
+
+    async def fetch():
+        shared_generation = 0
+        if shared_store and cache_ttl > 0:
+            shared_generation, shared = await asyncio.to_thread(shared_store.get_read, flight_key, prefix)
+            if shared and not opts.get('bypass_cache'):
+                return shared[0]
+        data, size = await _f5_fetch(method, url, path, opts, body, is_sys)
+        # A write that landed meanwhile may postdate this body: return it, but do not cache it
+        if cache_ttl > 0 and read_cache.generation(base_url, prefix) == generation:
+            if shared_store:
+                await asyncio.to_thread(shared_store.put_read, flight_key, data, size, cache_ttl, prefix, shared_generation)
+            else:
+                read_cache.put(flight_key, data, size, cache_ttl)
+        return data
+
+    # bypass_cache asks for a fresh read, not one that may have started before the caller's last write
+    if opts.get('bypass_cache'):
+        return await fetch()
+    # Identical concurrent GETs share one device round-trip and its parsed result. The generation is part of
+    # the key so a GET issued after a write never joins one that started before it.
+    return await f5_singleflight.do(flight_key + (generation,), fetch)
+
+async def f5_request_sys(method: str, path: str, body: dict, opts: dict, cache_ttl: float = 0):
+    return await f5_request(method, path, opts, body, is_sys=True, cache_ttl=cache_ttl)
+
+async def f5_transaction(opts: dict, calls: List[tuple]) -> Any:
+    # iControl REST transaction: queue (method, path, body) calls under one coordination id,
+    # then commit them all-or-nothing with a single VALIDATING patch
+    txn_url = f"{opts['f5_url'].rstrip('/')}/mgmt/tm/transaction"
+    txn, _ = await _f5_fetch('POST', txn_url, '/transaction', opts, {})
+    trans_id = str((txn or {}).get('transId') or '')
+    if not trans_id:
+        raise Exception('F5 API POST /transaction returned no transId')
+    headers = {"X-F5-REST-Coordination-Id": trans_id}
+    try:
+        # Queued one at a time so the device commits them in the order given
+        for method, path, body in calls:
+            await f5_request(method, path, opts, body, headers=headers)
+    except BaseException:
+        try:
+            await _f5_fetch('DELETE', f"{txn_url}/{trans_id}", f"/transaction/{trans_id}", opts)
+        except Exception as e:
+            logger.warning(f"Could not discard transaction {trans_id}: {e}")
+        raise
+    result, _ = await _f5_fetch('PATCH', f"{txn_url}/{trans_id}", f"/transaction/{trans_id}", opts, {'state': 'VALIDATING'})
+    state = (result or {}).get('state')
+    if state != 'COMPLETED':
+        raise Exception(f"F5 transaction {trans_id} ended in state {state}: {(result or {}).get('failureReason') or result}")
+    return result
+
+# ===== Collection Paging =====
+
+LIST_PAGING_ARGS = ('fields', 'filter', 'partition', 'top', 'skip', 'cursor')
+
+def is_paged_request(opts: dict) -> bool:
+    return any(opts.get(k) is not None for k in LIST_PAGING_ARGS)
+
+def encode_cursor(state: dict) -> str:
+    return base64.urlsafe_b64encode(json_dumps_bytes(state)).decode()
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        state = json_loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(state, dict):
+        raise ValueError('Invalid cursor')
+    return state
+
+def _name_matcher(pattern: str) -> Callable[[dict], bool]:
+    pattern = pattern.lower()
+    if any(c in pattern for c in '*?['):
+        return lambda item: fnmatch.fnmatchcase(str(item.get('name', '')).lower(), pattern)
+    return lambda item: pattern in str(item.get('fullPath') or item.get('name', '')).lower()
+
+async def fetch_collection_page(path: str, opts: dict, is_sys: bool = False, cache_ttl: float = 0) -> dict:
+    # A cursor carries the whole query, so continuation calls only need to pass it back
+    query = decode_cursor(opts['cursor']) if opts.get('cursor') else {k: opts.get(k) for k in LIST_PAGING_ARGS[:-1]}
+    fields = query.get('fields') or None
+    name_filter = query.get('filter') or None
+    partition = query.get('partition') or None
+    top = min(int(query.get('top') or LIST_DEFAULT_PAGE_SIZE), LIST_MAX_PAGE_SIZE)
+    skip = max(int(query.get('skip') or 0), 0)
+    if top <= 0:
+        raise ValueError('top must be a positive integer')
+
+    # Push what iControl REST understands to the device; the name filter is always local
+    params = {}
+    if fields:
+        params['$select'] = ','.join(dict.fromkeys(list(fields) + (['name', 'fullPath'] if name_filter else [])))
+    if partition:
+        params['$filter'] = f"partition eq {partition}"
+    if not name_filter:
+        params['$top'] = top
+        params['$skip'] = skip
+    qs = urllib.parse.urlencode(params, safe='$,', quote_via=urllib.parse.quote)
+    data = await f5_request('GET', f"{path}?{qs}" if qs else path, opts, is_sys=is_sys, cache_ttl=cache_ttl) or {}
+    items = data.get('items', [])
+
+    if 'totalItems' in data and not name_filter:
+        # Device paged the collection itself
+        total = data.get('totalItems')
+        page = items[:top]
+    else:
+        if partition:
+            items = [i for i in items if i.get('partition', partition) == partition]
+        if name_filter:
+            match = _name_matcher(name_filter)
+            items = [i for i in items if match(i)]
+        total = len(items)
+        page = items[skip:skip + top]
+
+    if fields:
+        page = [{k: i[k] for k in fields if k in i} for i in page]
+
+    next_skip = skip + len(page)
+    next_cursor = None
+    if page and total is not None and next_skip < total:
+        next_cursor = encode_cursor({'fields': fields, 'filter': name_filter, 'partition': partition, 'top': top, 'skip': next_skip})
+    return {'items': page, 'skip': skip, 'returned': len(page), 'total': total, 'next_cursor': next_cursor}
+
+# ===== Result Formatting =====
+# Token-lean tool output: iControl boilerplate stripped, collections rendered as CSV rows,
+# capped at a character budget with a pointer to the rest
+
+BOILERPLATE_FIELDS = ('kind', 'selfLink', 'generation')
+
+def _is_boilerplate(k: str, v: Any) -> bool:
+    # Bare subcollection links carry no data
+    return k in BOILERPLATE_FIELDS or (k.endswith('Reference') and isinstance(v, dict) and set(v) <= {'link', 'isSubcollection'})
+
+def strip_boilerplate(data: Any) -> Any:
+    if isinstance(data, dict):
+        return {k: strip_boilerplate(v) if isinstance(v, (dict, list)) else v
+                for k, v in data.items() if not _is_boilerplate(k, v)}
+    if isinstance(data, list):
+        return [strip_boilerplate(v) for v in data]
+    return data
+
+def _stat_rows(data: Any) -> Optional[List[dict]]:
+    # {"entries": {url: {"nestedStats": {"entries": {k: {"value"|"description": v}}}}}} -> one row per url
+    entries = data.get('entries') if isinstance(data, dict) else None
+    if not isinstance(entries, dict) or not entries:
+        return None
+    rows = []
+    for url, entry in entries.items():
+        nested = entry.get('nestedStats', {}).get('entries') if isinstance(entry, dict) else None
+        if not isinstance(nested, dict):
+            return None
+        row = {'id': urllib.parse.unquote(url.rpartition('/mgmt/tm/')[2] or url)}
+        for k, v in nested.items():
+            if isinstance(v, dict) and ('value' in v or 'description' in v):
+                row[k] = v.get('value', v.get('description'))
+        rows.append(row)
+    return rows
+
+def table_rows(data: Any) -> Optional[List[dict]]:
+    if isinstance(data, dict) and isinstance(data.get('items'), list):
+        data = data['items']
+    if isinstance(data, list) and all(isinstance(i, dict) for i in data):
+        return data
+    return _stat_rows(data)
+
+def _cell(value: Any) -> str:
+    if isinstance(value, str):
+        return value
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (dict, list)):
+        return json_dumps(value)
+    return str(value)
+
+def render_table(rows: List[dict], max_chars: int, more: Callable[[int], str]) -> tuple:
+    # Only rows that can fit are stripped and scanned for columns. A row's cells joined under the columns
+    # seen so far are a lower bound on its CSV line, so once that bound passes the budget no later row is shown.
+    kept = []
+    columns: Dict[str, None] = {}
+    size = 0
+    header = 0
+    for r in rows:
+        cells = {k: _cell(strip_boilerplate(v) if isinstance(v, (dict, list)) else v)
+                 for k, v in r.items() if not _is_boilerplate(k, v)}
+        for k in cells:
+            if k not in columns:
+                columns[k] = None
+                header += len(k) + 1
+        size += sum(len(v) + 1 for v in cells.values())
+        if kept and header + size > max_chars:
+            break
+        kept.append(cells)
+    columns = list(columns)
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator='\n')
+    writer.writerow(columns)
+    shown = 0
+    for cells in kept:
+        mark = buf.tell()
+        writer.writerow([cells.get(c, '') for c in columns])
+        if buf.tell() > max_chars and shown:
+            buf.seek(mark)
+            buf.truncate()
+            break
+        shown += 1
+    text = buf.getvalue()
+    if shown < len(rows):
+        text += f"...<truncated: {shown} of {len(rows)} rows shown ({max_chars} char budget); {more(shown)}>"
+    return text.rstrip('\n'), shown
+
+def output_format(opts: dict) -> str:
+    return opts.get('format') or TOOL_OUTPUT_DEFAULT_FORMAT
+
+def format_result(data: Any, opts: dict) -> str:
+    fmt = output_format(opts)
+    if fmt == 'json' and opts.get('max_chars') is None:
+        return format_json(data)
+    max_chars = int(opts.get('max_chars') or TOOL_OUTPUT_MAX_CHARS)
+    if fmt == 'table':
+        rows = table_rows(data)
+        if rows is not None:
+            return render_table(rows, max_chars, lambda shown: "raise max_chars to see more")[0]
+    text = format_json(data) if fmt == 'json' else json_dumps(strip_boilerplate(data))
+    if len(text) > max_chars:
+        text = text[:max_chars] + f"...<truncated at {max_chars} of {len(text)} chars; raise max_chars to see more>"
+    return text
+
+def format_page(page: dict, opts: dict) -> str:
+    fmt = output_format(opts)
+    if fmt != 'table':
+        return json_dumps(page if fmt == 'json' else strip_boilerplate(page))
+    max_chars = int(opts.get('max_chars') or TOOL_OUTPUT_MAX_CHARS)
+    skip = page['skip']
+    text, shown = render_table(page['items'], max_chars, lambda shown: f"continue with the same query and skip={skip + shown}")
+    footer = f"rows {skip}-{skip + shown} of {page['total']}"
+    # A truncated page continues from the marker above, not from the cursor
+    if page['next_cursor'] and shown == page['returned']:
+        footer += f"; next_cursor: {page['next_cursor']}"
+    return f"{text}\n{footer}"
+
+# ===== Stats Collector =====
+
+class StatsRing:
+    # Fixed-size time series: one array('d') of timestamps plus one per metric, sharing a write index
+    def __init__(self, capacity: int = STATS_RING_SIZE):
+        self.capacity = capacity
+        self.times = array('d', [0.0]) * capacity
+        self.series: Dict[str, array] = {}
+        self.head = 0
+        self.count = 0
+
+    def append(self, ts: float, values: Dict[str, float]):
+        i = self.head
+        self.times[i] = ts
+        for name, v in values.items():
+            col = self.series.get(name)
+            if col is None:
+                col = self.series[name] = array('d', [math.nan]) * self.capacity
+            col[i] = v
+        for name, col in self.series.items():
+            if name not in values:
+                col[i] = math.nan
+        self.head = (i + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        if self.head == 0:
+            self.prune()
+
+    def prune(self):
+        # Once per lap: drop series (e.g. members removed from a pool) with no sample left in the ring
+        for name in [n for n, col in self.series.items() if all(math.isnan(v) for v in col)]:
+            del self.series[name]
+
+    def indices_since(self, since: float) -> List[int]:
+        start = (self.head - self.count) % self.capacity
+        idx = [(start + k) % self.capacity for k in range(self.count)]
+        return [i for i in idx if self.times[i] >= since]
+
+STATS_COUNTER_SUFFIXES = ('totConns', 'bitsIn', 'bitsOut')
+
+def _nested_stat_entries(data: Any):
+    for e in ((data or {}).get('entries') or {}).values():
+        yield (e.get('nestedStats') or {}).get('entries') or {}
+
+def _nested_stat_value(n: dict, key: str) -> Optional[float]:
+    v = (n.get(key) or {}).get('value')
+    return float(v) if isinstance(v, (int, float)) else None
+
+def _is_auth_error(e: Exception) -> bool:
+    return isinstance(e, F5APIError) and e.status_code == 401
+
+class StatsCollector:
+    def __init__(self):
+        self._devices: Dict[str, dict] = {}
+
+    def _check_register(self, base_url: str, opts: dict):
+        if base_url not in self._devices and len(self._devices) >= STATS_MAX_DEVICES:
+            raise ValueError(f"Stats collector already tracks {STATS_MAX_DEVICES} devices")
+        current = self._devices.get(base_url)
+        if current and current['key'] != credential_key(opts):
+            raise ValueError(f"Device {base_url} is already registered with other credentials; they must unregister it first")
+
+    async def register(self, opts: dict, interval: float, pools: List[str]) -> dict:
+        base_url = opts['f5_url'].rstrip('/')
+        self._check_register(base_url, opts)
+        device = {
+            'opts': {k: opts[k] for k in ('f5_url', 'f5_username', 'f5_password')},
+            'key': credential_key(opts),
+            'interval': max(float(interval), STATS_MIN_INTERVAL),
+            'pools': list(dict.fromkeys(pools))[:STATS_MAX_POOLS],
+            'ring': StatsRing(),
+            'last_error': None,
+            'errors': {},
+        }
+        # First sample now: bad credentials are refused here instead of retrying a login every interval
+        try:
+            await self._collect(device)
+        except Exception as e:
+            if _is_auth_error(e):
+                raise ValueError(f"Device {base_url} rejected the credentials: {e}")
+            device['last_error'] = str(e)
+        self._check_register(base_url, opts)
+        self.unregister(base_url)
+        device['task'] = asyncio.create_task(self._run(device))
+        self._devices[base_url] = device
+        return device
+
+    def unregister(self, base_url: str) -> bool:
+        device = self._devices.pop(base_url, None)
+        if device:
+            device['task'].cancel()
+        return device is not None
+
+    def get(self, opts: dict) -> Optional[dict]:
+        device = self._devices.get((opts.get('f5_url') or '').rstrip('/'))
+        # Only the credentials that registered a device may read its samples
+        if device and device['key'] == credential_key(opts):
+            return device
+        return None
+
+    async def stop_all(self):
+        for base_url in list(self._devices):
+            self.unregister(base_url)
+
+    async def _run(self, device: dict):
+        auth_failures = 0
+        while True:
+            # Registration took the first sample; repeated login failures back off so the account is not locked
+            await asyncio.sleep(device['interval'] * 2 ** auth_failures)
+            try:
+                await self._collect(device)
+                auth_failures = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                device['last_error'] = str(e)
+                if _is_auth_error(e):
+                    auth_failures += 1
+                    if auth_failures >= STATS_MAX_AUTH_FAILURES:
+                        device['last_error'] = f"stopped after {auth_failures} login failures: {e}"
+                        logger.warning(f"Stats sampling stopped for {device['opts']['f5_url']}: {e}")
+                        return
+                logger.warning(f"Stats sample failed for {device['opts']['f5_url']}: {e}")
+
+    async def _collect(self, device: dict):
+        values, errors = await self.sample(device)
+        device['errors'] = errors
+        device['last_error'] = None
+        if values:
+            device['ring'].append(time.time(), values)
+
+    async def sample(self, device: dict) -> tuple:
+        # One missing pool must not cost the device-wide samples: failures are reported per source.
+        # Raises only when every request failed.
+        opts = device['opts']
+        sources = ['tmm-traffic', 'tmm-info'] + [f"pool {p}" for p in device['pools']]
+        # Alone first: with bad credentials every concurrent request would attempt its own login
+        try:
+            results = [await f5_request_sys('GET', '/tmm-traffic/stats', None, opts)]
+        except Exception as e:
+            if _is_auth_error(e):
+                raise
+            results = [e]
+        results += await asyncio.gather(
+            f5_request_sys('GET', '/tmm-info/stats', None, opts),
+            *[f5_request('GET', f"/pool/~Common~{urllib.parse.quote(p)}/members/stats", opts) for p in device['pools']],
+            return_exceptions=True
+        )
+        failed = [(source, r) for source, r in zip(sources, results) if isinstance(r, BaseException)]
+        for _, r in failed:
+            if isinstance(r, asyncio.CancelledError):
+                raise r
+        if len(failed) == len(results):
+            raise failed[0][1]
+        errors = {source: str(r) for source, r in failed}
+        traffic, tmm, *pools = [None if isinstance(r, BaseException) else r for r in results]
+        values: Dict[str, float] = {}
+        for n in _nested_stat_entries(traffic):
+            for side, prefix in (('clientside', 'client'), ('serverside', 'server')):
+                for stat in ('curConns', 'totConns', 'bitsIn', 'bitsOut'):
+                    v = _nested_stat_value(n, f"{side}.{stat}")
+                    if v is not None:
+                        values[f"{prefix}.{stat}"] = values.get(f"{prefix}.{stat}", 0.0) + v
+        usage = [v for v in (_nested_stat_value(n, 'fiveSecAvgUsageRatio') for n in _nested_stat_entries(tmm)) if v is not None]
+        if usage:
+            values['tmm.cpu'] = sum(usage) / len(usage)
+        for pool_name, stats in zip(device['pools'], pools):
+            for n in _nested_stat_entries(stats):
+                addr = (n.get('addr') or {}).get('description', 'unknown')
+                port = (n.get('port') or {}).get('value', 'unknown')
+                for stat in ('curConns', 'totConns', 'bitsIn', 'bitsOut'):
+                    v = _nested_stat_value(n, f"serverside.{stat}")
+                    if v is not None:
+                        values[f"member.{pool_name}/{addr}:{port}.{stat}"] = v
+        return values, errors
+
+    def trend(self, device: dict, window: float, prefix: str = None) -> dict:
+        ring: StatsRing = device['ring']
+        idx = ring.indices_since(time.time() - window)
+        metrics = {}
+        for name, col in ring.series.items():
+            if prefix and not name.startswith(prefix):
+                continue
+            points = [(ring.times[i], col[i]) for i in idx if not math.isnan(col[i])]
+            if not points:
+                continue
+            if name.endswith(STATS_COUNTER_SUFFIXES):
+                # Counters: sum positive steps so a device counter reset does not show as a negative rate
+                delta = sum(max(b[1] - a[1], 0.0) for a, b in zip(points, points[1:]))
+                span = points[-1][0] - points[0][0]
+                metrics[name] = {'delta': delta, 'per_sec': round(delta / span, 3) if span > 0 else None}
+            else:
+                vals = [v for _, v in points]
+                metrics[name] = {'last': vals[-1], 'min': min(vals), 'max': max(vals), 'avg': round(sum(vals) / len(vals), 3)}
+        first = ring.times[idx[0]] if idx else None
+        last = ring.times[idx[-1]] if idx else None
+        return {
+            'device': device['opts']['f5_url'],
+            'samples': len(idx),
+            'span_seconds': round(last - first, 1) if idx else 0,
+            'interval': device['interval'],
+            'last_error': device['last_error'],
+            'errors': device['errors'],
+            'metrics': metrics,
+        }
+
+stats_collector = StatsCollector()
+
+# ===== LTM Config Index =====
+# Per-device snapshot of pools, members and virtual servers with reverse lookups.
+# Refreshed incrementally by comparing object generation counters; writes mark it stale.
+
+def member_address_port(m: dict) -> tuple:
+    name = m.get('name') or ''
+    address = m.get('address') or ''
+    # IPv6 members are named addr.port, IPv4 members addr:port
+    sep = '.' if ':' in (address or name.rpartition('.')[0]) else ':'
+    head, _, port = name.rpartition(sep)
+    return address or head.rpartition('/')[2], port
+
+def ltm_full_path(name: str, partition: str = 'Common') -> str:
+    return name if name.startswith('/') else f"/{partition}/{name}"
+
+def item_full_path(item: dict) -> str:
+    return item.get('fullPath') or ltm_full_path(item.get('name', ''), item.get('partition', 'Common'))
+
+
+class DeviceIndex:
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.dirty = True
+        self.synced = 0.0
+        self.full_synced = 0.0
+        self.full_syncs = 0
+        self.incremental_syncs = 0
+        self.objects_fetched = 0
+
+    def sync_stats(self) -> dict:
+        return {
+            'age_seconds': round(time.monotonic() - self.synced, 1) if self.synced else None,
+            'dirty': self.dirty,
+            'full_syncs': self.full_syncs,
+            'incremental_syncs': self.incremental_syncs,
+            'objects_fetched': self.objects_fetched,
+        }
+
+class DeviceIndexRegistry(ABC):
+    # One index per device and credential set; subclasses implement the two sync strategies
+    index_class = DeviceIndex
+
+    def __init__(self, ttl: float, full_sync_interval: float, max_devices: int):
+        self.ttl = ttl
+        self.full_sync_interval = full_sync_interval
+        self.max_devices = max_devices
+        self._devices: "OrderedDict[tuple, DeviceIndex]" = OrderedDict()
+
+    async def get(self, opts: dict, refresh: bool = False, warm_only: bool = False):
+        # Keyed by credential fingerprint: only credentials that built an index may read it.
+        # warm_only: None instead of building a cold index or re-downloading a dirty one
+        key = credential_key(opts)
+        index = self._devices.get(key)
+        if index is None and warm_only:
+            return None
+        if index is None:
+            index = self._devices[key] = self.index_class()
+            while len(self._devices) > self.max_devices:
+                self._devices.popitem(last=False)
+        self._devices.move_to_end(key)
+        async with index.lock:
+            now = time.monotonic()
+            try:
+                full = refresh or index.dirty or now - index.full_synced > self.full_sync_interval
+                if not full and now - index.synced <= self.ttl:
+                    return index
+                if full and warm_only and not refresh:
+                    return None
+                if not full:
+                    # False: too much changed for an incremental sync to be cheaper
+                    full = not await self._incremental_sync(index, opts)
+                    if not full:
+                        index.incremental_syncs += 1
+                if full:
+                    await self._full_sync(index, opts)
+                    index.full_syncs += 1
+                    index.full_synced = time.monotonic()
+            except Exception:
+                if not index.synced and self._devices.get(key) is index:
+                    del self._devices[key]
+                raise
+            index.dirty = False
+            index.synced = time.monotonic()
+        return index
+
+    def mark_dirty(self, base_url: str):
+        for key, index in self._devices.items():
+            if key[0] == base_url:
+                index.dirty = True
+
+    def mark_stale(self, base_url: str):
+        # Next query runs an incremental sync instead of trusting the TTL
+        for key, index in self._devices.items():
+            if key[0] == base_url:
+                index.synced = min(index.synced, time.monotonic() - self.ttl - 1)
+
+    @staticmethod
+    async def _get_if_exists(path: str, opts: dict, is_sys: bool = False):
+        # None when the object was deleted between the listing and this read
+        try:
+            return await f5_request('GET', path, opts, is_sys=is_sys)
+        except F5APIError as e:
+            if e.status_code == 404:
                 return None
-                
-            return json.loads(resp_text)
-            
-        except httpx.RequestError as e:
-            logger.error(f"Underlying fetch error: {e}")
-            raise Exception(f"fetch failed: {str(e)}")
-        except json.JSONDecodeError:
+            raise
+
+    @abstractmethod
+    async def _full_sync(self, index: DeviceIndex, opts: dict):
+        ...
+
+    @abstractmethod
+    async def _incremental_sync(self, index: DeviceIndex, opts: dict) -> bool:
+        ...
+
+    def stats(self) -> dict:
+        return {f"{key[0]} ({key[1]})": index.stats() for key, index in self._devices.items()}
+
+class LtmConfigIndex(DeviceIndex):
+    def __init__(self):
+        super().__init__()
+        self.pools: Dict[str, dict] = {}              # pool fullPath -> {'generation', 'members': [(address, port)]}
+        self.virtuals: Dict[str, dict] = {}           # virtual fullPath -> {'generation', 'destination', 'pool', 'ipProtocol'}
+        self.virtuals_by_pool: Dict[str, set] = {}    # pool fullPath -> virtual fullPaths
+        self.member_pools: Dict[tuple, set] = {}      # (address, port) -> pool fullPaths
+        self.address_ports: Dict[str, set] = {}       # address -> ports
+        self.members_synced = 0.0                     # when pool membership was last listed from the device
+
+    def set_pool(self, path: str, generation: Any, members: List[dict]):
+        self.remove_pool(path)
+        paths = {}
+        for m in members:
+            paths.setdefault(member_address_port(m), m.get('fullPath'))
+        keys = list(paths)
+        self.pools[path] = {'generation': generation, 'members': keys, 'member_paths': paths}
+        for key in keys:
+            self.member_pools.setdefault(key, set()).add(path)
+            self.address_ports.setdefault(key[0], set()).add(key[1])
+
+    def remove_pool(self, path: str):
+        pool = self.pools.pop(path, None)
+        if not pool:
+            return
+        for key in pool['members']:
+            pools = self.member_pools.get(key)
+            if pools is None:
+                continue
+            pools.discard(path)
+            if not pools:
+                del self.member_pools[key]
+                ports = self.address_ports.get(key[0])
+                ports.discard(key[1])
+                if not ports:
+                    del self.address_ports[key[0]]
+
+    def set_virtual(self, item: dict):
+        path = item_full_path(item)
+        self.remove_virtual(path)
+        pool = item.get('pool') or None
+        self.virtuals[path] = {'generation': item.get('generation'), 'destination': item.get('destination'), 'pool': pool,
+                               'ipProtocol': item.get('ipProtocol')}
+        if pool:
+            self.virtuals_by_pool.setdefault(pool, set()).add(path)
+
+    def remove_virtual(self, path: str):
+        virtual = self.virtuals.pop(path, None)
+        if virtual and virtual['pool']:
+            paths = self.virtuals_by_pool.get(virtual['pool'])
+            paths.discard(path)
+            if not paths:
+                del self.virtuals_by_pool[virtual['pool']]
+
+    def member_usage(self, address: str, port: Optional[str] = None) -> List[tuple]:
+        ports = [str(port)] if port is not None else sorted(self.address_ports.get(address, ()))
+        rows = []
+        for p in ports:
+            for pool in sorted(self.member_pools.get((address, p), ())):
+                rows.append((pool, f"{address}:{p}", sorted(self.virtuals_by_pool.get(pool, ()))))
+        return rows
+
+    def empty_pools(self) -> List[tuple]:
+        return [(path, sorted(self.virtuals_by_pool.get(path, ()))) for path, pool in sorted(self.pools.items()) if not pool['members']]
+
+    def stats(self) -> dict:
+        return {
+            'pools': len(self.pools),
+            'virtuals': len(self.virtuals),
+            'members': len(self.member_pools),
+            **self.sync_stats(),
+        }
+
+POOL_INDEX_SELECT = 'name,partition,fullPath,generation,membersReference'
+VIRTUAL_INDEX_SELECT = 'name,partition,fullPath,generation,destination,pool,ipProtocol'
+
+class ConfigIndexRegistry(DeviceIndexRegistry):
+    index_class = LtmConfigIndex
+
+    async def _full_sync(self, index: LtmConfigIndex, opts: dict):
+        started = time.monotonic()
+        pools, virtuals = await asyncio.gather(
+            f5_request('GET', f"/pool?expandSubcollections=true&$select={POOL_INDEX_SELECT}", opts),
+            f5_request('GET', f"/virtual?$select={VIRTUAL_INDEX_SELECT}", opts),
+        )
+        pool_items = (pools or {}).get('items', [])
+        virtual_items = (virtuals or {}).get('items', [])
+        fresh = LtmConfigIndex()
+        self._set_pools(fresh, pool_items)
+        for v in virtual_items:
+            fresh.set_virtual(v)
+        index.pools, index.virtuals = fresh.pools, fresh.virtuals
+        index.virtuals_by_pool, index.member_pools, index.address_ports = fresh.virtuals_by_pool, fresh.member_pools, fresh.address_ports
+        index.members_synced = started
+        index.objects_fetched += len(pool_items) + len(virtual_items)
+
+    @staticmethod
+    def _set_pools(index: LtmConfigIndex, pool_items: List[dict]):
+        for p in pool_items:
+            index.set_pool(item_full_path(p), p.get('generation'), (p.get('membersReference') or {}).get('items') or [])
+
+    async def _incremental_sync(self, index: LtmConfigIndex, opts: dict):
+        # Pools are re-listed with their members every time: adding or removing a member out of band need not
+        # bump the pool generation. Virtuals are listed with generations only and re-read just where changed.
+        started = time.monotonic()
+        pools, virtuals = await asyncio.gather(
+            f5_request('GET', f"/pool?expandSubcollections=true&$select={POOL_INDEX_SELECT}", opts),
+            f5_request('GET', '/virtual?$select=name,partition,fullPath,generation', opts),
+        )
+        pool_items = (pools or {}).get('items', [])
+        virtual_items = {item_full_path(v): v for v in (virtuals or {}).get('items', [])}
+        changed_virtuals = [path for path, v in virtual_items.items()
+                            if path not in index.virtuals or index.virtuals[path]['generation'] != v.get('generation')]
+        if len(changed_virtuals) > CONFIG_INDEX_MAX_INCREMENTAL:
+            return False
+        rows = await asyncio.gather(*[
+            self._get_if_exists(f"/virtual/{urllib.parse.quote(path.replace('/', '~'))}?$select={VIRTUAL_INDEX_SELECT}", opts)
+            for path in changed_virtuals
+        ])
+
+        for path in set(index.pools) - {item_full_path(p) for p in pool_items}:
+            index.remove_pool(path)
+        self._set_pools(index, pool_items)
+        index.members_synced = started
+
+        for path in set(index.virtuals) - set(virtual_items):
+            index.remove_virtual(path)
+        for row in rows:
+            if row:
+                index.set_virtual(row)
+
+        index.objects_fetched += len(pool_items) + len(changed_virtuals)
+        return True
+
+config_index = ConfigIndexRegistry(CONFIG_INDEX_TTL, CONFIG_INDEX_FULL_SYNC, CONFIG_INDEX_MAX_DEVICES)
+
+# ===== Certificate Index =====
+# Parsed /sys/crypto/cert per device, kept sorted by expiration so "expiring within N days" is a bisect
+
+CERT_INDEX_SELECT = 'name,partition,fullPath,generation,commonName,subject,subjectAlternativeName,expirationDate'
+
+def cert_host_names(cert: dict) -> List[str]:
+    names = [n.strip()[4:] for n in (cert.get('subjectAlternativeName') or '').split(',') if n.strip().startswith('DNS:')]
+    if cert.get('commonName'):
+        names.append(cert['commonName'])
+    return list(dict.fromkeys(n.lower() for n in names if n))
+
+class CertIndex(DeviceIndex):
+    def __init__(self):
+        super().__init__()
+        self.certs: Dict[str, dict] = {}          # fullPath -> parsed row
+        self.by_expiry: List[tuple] = []         # sorted (expiration, fullPath); known expirations only
+        self.unknown_expiry: set = set()         # fullPaths without a parseable expirationDate
+        self.by_host: Dict[str, set] = {}        # lowercased DNS name / CN -> fullPaths
+
+    def set_cert(self, item: dict):
+        path = item_full_path(item)
+        self.remove_cert(path)
+        try:
+            expires = int(item.get('expirationDate'))
+        except (TypeError, ValueError):
+            expires = 0
+        cert = {
+            'path': path,
+            'partition': item.get('partition') or path.split('/')[1],
+            'generation': item.get('generation'),
+            'expires': expires,
+            'cn': item.get('commonName') or '',
+            'subject': item.get('subject') or '',
+            'san': item.get('subjectAlternativeName') or '',
+        }
+        cert['hosts'] = cert_host_names(item)
+        self.certs[path] = cert
+        if expires:
+            bisect.insort(self.by_expiry, (expires, path))
+        else:
+            self.unknown_expiry.add(path)
+        for host in cert['hosts']:
+            self.by_host.setdefault(host, set()).add(path)
+
+    def remove_cert(self, path: str):
+        cert = self.certs.pop(path, None)
+        if not cert:
+            return
+        self.unknown_expiry.discard(path)
+        i = bisect.bisect_left(self.by_expiry, (cert['expires'], path))
+        if i < len(self.by_expiry) and self.by_expiry[i] == (cert['expires'], path):
+            del self.by_expiry[i]
+        for host in cert['hosts']:
+            paths = self.by_host.get(host)
+            paths.discard(path)
+            if not paths:
+                del self.by_host[host]
+
+    def expiring(self, before: float) -> List[dict]:
+        end = bisect.bisect_right(self.by_expiry, (before, '\uffff'))
+        return [self.certs[path] for _, path in self.by_expiry[:end]]
+
+    def find(self, query: str) -> List[dict]:
+        q = query.lower().strip()
+        # Host names: exact match plus the wildcard one level up (a.b.c is covered by *.b.c)
+        paths = set(self.by_host.get(q, ()))
+        if '.' in q:
+            paths |= self.by_host.get('*.' + q.split('.', 1)[1], set())
+        if not paths:
+            paths = {p for p, c in self.certs.items() if q in c['subject'].lower() or q in c['san'].lower() or q in p.lower()}
+        return sorted((self.certs[p] for p in paths), key=lambda c: c['expires'])
+
+    def partition_counts(self, now: float, within: float) -> Dict[str, dict]:
+        counts: Dict[str, dict] = {}
+        for cert in self.certs.values():
+            c = counts.setdefault(cert['partition'], {'total': 0, 'expired': 0, 'expiring': 0, 'unknown': 0})
+            c['total'] += 1
+            if not cert['expires']:
+                c['unknown'] += 1
+            elif cert['expires'] <= now:
+                c['expired'] += 1
+            elif cert['expires'] <= now + within:
+                c['expiring'] += 1
+        return dict(sorted(counts.items()))
+
+    def stats(self) -> dict:
+        return {'certs': len(self.certs), **self.sync_stats()}
+
+class CertIndexRegistry(DeviceIndexRegistry):
+    index_class = CertIndex
+
+    async def _full_sync(self, index: CertIndex, opts: dict):
+        data = await f5_request_sys('GET', f"/crypto/cert?$select={CERT_INDEX_SELECT}", None, opts)
+        items = (data or {}).get('items', [])
+        fresh = CertIndex()
+        for item in items:
+            fresh.set_cert(item)
+        index.certs, index.by_expiry, index.by_host, index.unknown_expiry = fresh.certs, fresh.by_expiry, fresh.by_host, fresh.unknown_expiry
+        index.objects_fetched += len(items)
+
+    async def _incremental_sync(self, index: CertIndex, opts: dict):
+        # Generations only; full rows are re-read just for certificates that changed
+        data = await f5_request_sys('GET', '/crypto/cert?$select=name,partition,fullPath,generation', None, opts)
+        listed = {item_full_path(i): i for i in (data or {}).get('items', [])}
+        changed = [path for path, i in listed.items()
+                   if path not in index.certs or index.certs[path]['generation'] != i.get('generation')]
+        if len(changed) > CERT_INDEX_MAX_INCREMENTAL:
+            return False
+        rows = await asyncio.gather(*[
+            self._get_if_exists(f"/crypto/cert/{urllib.parse.quote(path.replace('/', '~'))}?$select={CERT_INDEX_SELECT}", opts, is_sys=True)
+            for path in changed
+        ])
+        for path in set(index.certs) - set(listed):
+            index.remove_cert(path)
+        for path, row in zip(changed, rows):
+            if row:
+                index.set_cert(row)
+            else:
+                index.remove_cert(path)
+        index.objects_fetched += len(changed)
+        return True
+
+cert_index = CertIndexRegistry(CERT_INDEX_TTL, CERT_INDEX_FULL_SYNC, CERT_INDEX_MAX_DEVICES)
+
+# ===== Progress & Cancellation =====
+# Handlers call report_progress(); it is a no-op unless the caller is streaming
+
+progress_reporter: contextvars.ContextVar[Optional[Callable[[dict], None]]] = contextvars.ContextVar('progress_reporter', default=None)
+
+def report_progress(progress: float, total: Optional[float] = None, message: Optional[str] = None):
+    reporter = progress_reporter.get()
+    if reporter is None:
+        return
+    event = {'progress': progress}
+    if total is not None:
+        event['total'] = total
+    if message:
+        event['message'] = message
+    reporter(event)
+
+class RequestCancelledError(Exception):
+    pass
+
+# JSON-RPC tools/call tasks by (session, request id), so notifications/cancelled can stop them.
+# Request ids are only unique per client: a cancellation is looked up in the sender's session alone.
+jsonrpc_session: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('jsonrpc_session', default=None)
+jsonrpc_in_flight: Dict[tuple, asyncio.Task] = {}
+
+def in_flight_key(request_id: Any) -> Optional[tuple]:
+    session = jsonrpc_session.get()
+    if session is None or request_id is None:
+        return None
+    return (session, json_dumps(request_id))
+
+async def run_cancellable(request_id: Any, coro):
+    task = asyncio.ensure_future(coro)
+    key = in_flight_key(request_id)
+    if key is not None:
+        jsonrpc_in_flight[key] = task
+    try:
+        await asyncio.wait({task})
+    finally:
+        if key is not None and jsonrpc_in_flight.get(key) is task:
+            del jsonrpc_in_flight[key]
+        # Caller went away: stop issuing device calls
+        if not task.done():
+            task.cancel()
+            mcp_requests_cancelled.inc("disconnect")
+    if task.cancelled():
+        raise RequestCancelledError(f"Request {request_id} was cancelled")
+    return task.result()
+
+def cancel_jsonrpc_request(request_id: Any) -> bool:
+    key = in_flight_key(request_id)
+    task = jsonrpc_in_flight.get(key) if key else None
+    if task is None or task.done():
+        return False
+    task.cancel()
+    mcp_requests_cancelled.inc("client")
+    return True
+
+def sse_event(data: Any, event: str = "message") -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + json_dumps_bytes(data) + b"\n\n"
+
+def wants_event_stream(request: Request) -> bool:
+    return 'text/event-stream' in request.headers.get('accept', '')
+
+async def stream_with_progress(request: Request, work: Callable[[], Any], progress_event: Callable[[dict], Optional[bytes]]):
+    # work() produces the final SSE event; progress events are emitted as they arrive
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def run():
+        progress_reporter.set(events.put_nowait)
+        try:
+            return await work()
+        finally:
+            events.put_nowait(None)
+
+    task = asyncio.create_task(run())
+    try:
+        while True:
+            try:
+                event = await asyncio.wait_for(events.get(), SSE_KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    return
+                yield b": keepalive\n\n"
+                continue
+            if event is None:
+                break
+            chunk = progress_event(event)
+            if chunk:
+                yield chunk
+        yield await task
+    finally:
+        if not task.done():
+            task.cancel()
+            mcp_requests_cancelled.inc("disconnect")
+
+# ===== Background Jobs =====
+# Bounded, expiring in-memory job table; at most JOB_WORKERS jobs run at once
+
+JOB_STATUSES = ('queued', 'running', 'succeeded', 'failed', 'cancelled')
+
+class JobManager:
+    def __init__(self, workers: int, max_jobs: int, ttl: float):
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self._slots = asyncio.Semaphore(workers)
+        self.jobs: "OrderedDict[str, dict]" = OrderedDict()
+
+    def _expire(self):
+        now = time.time()
+        for job_id in [j for j, job in self.jobs.items() if job['finished'] and now - job['finished'] > self.ttl]:
+            del self.jobs[job_id]
+
+    def submit(self, tool: str, runner: Callable[[], Any]) -> dict:
+        self._expire()
+        if len(self.jobs) >= self.max_jobs:
+            finished = [j for j, job in self.jobs.items() if job['finished']]
+            for job_id in finished[:len(self.jobs) - self.max_jobs + 1]:
+                del self.jobs[job_id]
+        if len(self.jobs) >= self.max_jobs:
+            raise ValueError(f"Too many active jobs ({self.max_jobs}); retry later")
+        job = {
+            'id': secrets.token_urlsafe(12), 'tool': tool, 'status': 'queued',
+            'created': time.time(), 'started': None, 'finished': None,
+            'progress': None, 'result': None, 'error': None,
+        }
+        self.jobs[job['id']] = job
+        job['task'] = asyncio.create_task(self._run(job, runner))
+        return job
+
+    async def _publish(self, job: dict):
+        # Lets getJobStatus/cancelJob served by another worker see this job
+        if shared_store:
+            try:
+                await asyncio.to_thread(shared_store.put_job, self.view(job), self.ttl)
+            except Exception as e:
+                logger.warning(f"Could not publish job {job['id']}: {e}")
+
+    async def _run(self, job: dict, runner: Callable[[], Any]):
+        progress_reporter.set(lambda p: job.__setitem__('progress', p))
+        try:
+            await self._publish(job)
+            async with self._slots:
+                job['status'] = 'running'
+                job['started'] = time.time()
+                await self._publish(job)
+                result = await runner()
+            job['result'] = '\n'.join(c.get('text', '') for c in result.get('content', []))
+            job['status'] = 'succeeded'
+        except asyncio.CancelledError:
+            job['status'] = 'cancelled'
+        except Exception as e:
+            job['error'] = str(e)
+            job['status'] = 'failed'
+        finally:
+            job['finished'] = time.time()
+            await asyncio.shield(self._publish(job))
+
+    def get(self, job_id: str) -> Optional[dict]:
+        self._expire()
+        return self.jobs.get(job_id)
+
+    async def get_shared(self, job_id: str) -> Optional[dict]:
+        if not shared_store:
             return None
+        return await asyncio.to_thread(shared_store.get_job, job_id)
+
+    async def watch_cancellations(self):
+        # cancelJob on another worker only flags the job; the worker running it polls for the flag
+        while True:
+            await asyncio.sleep(JOB_CANCEL_POLL_INTERVAL)
+            active = [j for j, job in self.jobs.items() if not job['finished']]
+            if not active:
+                continue
+            try:
+                for job_id in await asyncio.to_thread(shared_store.cancel_requests, active):
+                    self.cancel(job_id)
+            except Exception as e:
+                logger.warning(f"Job cancellation poll failed: {e}")
 
-async def f5_request_sys(method: str, path: str, body: dict, opts: dict):
-    return await f5_request(method, path, opts, body, is_sys=True)
+    def cancel(self, job_id: str) -> bool:
+        job = self.get(job_id)
+        if not job or job['finished']:
+            return False
+        job['task'].cancel()
+        return True
+
+    @staticmethod
+    def view(job: dict) -> dict:
+        return {k: v for k, v in job.items() if k != 'task' and v is not None}
+
+    def stats(self) -> dict:
+        counts = dict.fromkeys(JOB_STATUSES, 0)
+        for job in self.jobs.values():
+            counts[job['status']] += 1
+        return counts
+
+    async def cancel_all(self):
+        tasks = [job['task'] for job in self.jobs.values() if not job['task'].done()]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+jobs = JobManager(JOB_WORKERS, JOB_MAX_JOBS, JOB_RESULT_TTL)
+
+# ===== Mutation Preflight =====
+# Mutation tools build their REST calls first, check them against the config index, then either
+# send them or (dry_run) return them. Doomed calls fail here without a device round-trip.
+
+async def preflight(tool: str, opts: dict, check: Callable[[LtmConfigIndex], List[str]], pools: tuple = ()) -> Optional[LtmConfigIndex]:
+    if not (MUTATION_PREFLIGHT or opts.get('dry_run')):
+        return None
+    try:
+        # Only a dry run builds a cold index; a plain write is checked when one is already at hand
+        index = await config_index.get(opts, refresh=bool(opts.get('refresh')), warm_only=not opts.get('dry_run'))
+    except Exception as e:
+        if opts.get('dry_run'):
+            raise
+        logger.warning(f"{tool}: preflight skipped, config index unavailable: {e}")
+        index = None
+    if index is None:
+        mcp_preflight_checks.inc(tool, "skipped")
+        return None
+    problems = check(index)
+    if problems and time.monotonic() - index.synced > MUTATION_PREFLIGHT_RECHECK_AGE:
+        # The device may have changed out of band since the last sync: confirm before refusing.
+        # Member changes need not bump a pool's generation, so the pools checked are re-read.
+        base_url = opts['f5_url'].rstrip('/')
+        config_index.mark_stale(base_url)
+        for pool in pools:
+            config_index.mark_stale(base_url, pool)
+        index = await config_index.get(opts, warm_only=True) or index
+        problems = check(index)
+    if problems:
+        mcp_preflight_checks.inc(tool, "rejected")
+        raise ValueError(f"{tool} rejected before reaching the device: {'; '.join(problems)} {config_index_note(index)}")
+    mcp_preflight_checks.inc(tool, "passed")
+    return index
+
+def dry_run_result(tool: str, calls: List[tuple], opts: dict, note: str) -> dict:
+    plan = [{'method': method, 'path': f"/mgmt/tm/ltm{path}", **({'body': body} if body is not None else {})}
+            for method, path, body in calls]
+    text = f"DRY RUN {tool}: would send {len(calls)} REST calls, sent none {note}\n{format_json(plan)}"
+    return {'content': [{'type': 'text', 'text': text}]}
+
+def virtual_destination(ip: str, port: Any) -> str:
+    # BIG-IP names IPv6 destinations addr.port, IPv4 addr:port
+    return f"{ip}.{port}" if ':' in ip else f"{ip}:{port}"
+
+def member_problems(index: LtmConfigIndex, pool: str, address: str, port: Any) -> List[str]:
+    if pool not in index.pools:
+        return [f"pool {pool} does not exist"]
+    if (address, str(port)) not in index.pools[pool]['members']:
+        return [f"{address}:{port} is not a member of {pool}"]
+    return []
 
 # ===== Tool Implementations =====
 
@@ -127,20 +2073,46 @@ async def run_configure_pool(opts):
     members = opts.get('members')
     if not pool_name or not isinstance(members, list):
         raise ValueError('Missing pool_name or members')
-        
-    # Create Pool
-    await f5_request('POST', '/pool', opts, {'name': pool_name, 'partition': 'Common'})
-    
-    # Add Members
-    for m in members:
-        member_name = f"{m.get('address')}:{m.get('port')}"
-        await f5_request(
-            'POST',
-            f"/pool/~Common~{pool_name}/members",
-            opts,
-            {'partition': 'Common', 'name': member_name, 'address': m.get('address')}
-        )
-    return {'content': [{'type': 'text', 'text': f"OK Pool '{pool_name}' created with {len(members)} members."}]}
+
+    # Validate every member up front so a bad entry never leaves a half-built pool
+    pool_members = []
+    errors = []
+    seen = set()
+    for i, m in enumerate(members):
+        address = m.get('address') if isinstance(m, dict) else None
+        port = m.get('port') if isinstance(m, dict) else None
+        if not address or port is None:
+            errors.append(f"members[{i}]: missing address or port")
+            continue
+        try:
+            port = int(port)
+        except (TypeError, ValueError):
+            port = -1
+        if not 0 <= port <= 65535:
+            errors.append(f"members[{i}]: invalid port {m.get('port')}")
+            continue
+        member_name = f"{address}:{port}"
+        if member_name in seen:
+            errors.append(f"members[{i}]: duplicate member {member_name}")
+            continue
+        seen.add(member_name)
+        pool_members.append({'name': member_name, 'address': address, 'partition': 'Common'})
+    if errors:
+        raise ValueError(f"Pool '{pool_name}' not created, invalid members: " + '; '.join(errors))
+
+    # Single POST with inline members: one round-trip, applied all-or-nothing by the device
+    body = {'name': pool_name, 'partition': 'Common', 'members': pool_members}
+    pool = ltm_full_path(pool_name)
+    index = await preflight('configurePool', opts, lambda ix: [f"pool {pool} already exists"] if pool in ix.pools else [])
+    if opts.get('dry_run'):
+        return dry_run_result('configurePool', [('POST', '/pool', body)], opts, config_index_note(index))
+
+    report_progress(0, 1, f"Creating pool '{pool_name}' with {len(pool_members)} members")
+    await f5_request('POST', '/pool', opts, body)
+    report_progress(1, 1, f"Pool '{pool_name}' created")
+
+    results = '\n'.join(f"  {m['name']}: added" for m in pool_members)
+    return {'content': [{'type': 'text', 'text': f"OK Pool '{pool_name}' created with {len(pool_members)} members.\n{results}"}]}
 
 async def run_remove_member(opts):
     pool_name = opts.get('pool_name')
@@ -155,8 +2127,13 @@ async def run_remove_member(opts):
     import urllib.parse
     encoded_pool = urllib.parse.quote(pool_name)
     encoded_id = urllib.parse.quote(member_id)
-    
-    await f5_request('DELETE', f"/pool/~Common~{encoded_pool}/members/{encoded_id}", opts)
+    path = f"/pool/~Common~{encoded_pool}/members/{encoded_id}"
+
+    pool = ltm_full_path(pool_name)
+    index = await preflight('removeMember', opts, lambda ix: member_problems(ix, pool, member_address, member_port), (pool,))
+    if opts.get('dry_run'):
+        return dry_run_result('removeMember', [('DELETE', path, None)], opts, config_index_note(index))
+    await f5_request('DELETE', path, opts)
     return {'content': [{'type': 'text', 'text': f"OK Removed member {member_id} from pool '{pool_name}'."}]}
 
 async def run_delete_pool(opts):
@@ -164,14 +2141,28 @@ async def run_delete_pool(opts):
     if not pool_name: raise ValueError('Missing pool_name')
     import urllib.parse
     encoded_pool = urllib.parse.quote(pool_name)
+    pool = ltm_full_path(pool_name)
+
+    def check(ix: LtmConfigIndex) -> List[str]:
+        if pool not in ix.pools:
+            return [f"pool {pool} does not exist"]
+        users = sorted(ix.virtuals_by_pool.get(pool, ()))
+        return [f"pool {pool} is still used by virtual servers {', '.join(users)}"] if users else []
+
+    index = await preflight('deletePool', opts, check)
+    if opts.get('dry_run'):
+        return dry_run_result('deletePool', [('DELETE', f"/pool/{encoded_pool}", None)], opts, config_index_note(index))
     await f5_request('DELETE', f"/pool/{encoded_pool}", opts)
     return {'content': [{'type': 'text', 'text': f"OK Pool '{pool_name}' deleted."}]}
 
 async def run_list_all_pool_stat(opts):
     if not all(k in opts for k in ['f5_url', 'f5_username', 'f5_password']):
         raise ValueError('Missing f5_url, f5_username or f5_password')
-    data = await f5_request('GET', '/pool', opts)
-    return {'content': [{'type': 'text', 'text': f"All Pools:\n{json.dumps(data, indent=2)}"}]}
+    if is_paged_request(opts):
+        page = await fetch_collection_page('/pool', opts, cache_ttl=READ_CACHE_TTLS['listAllPoolStat'])
+        return {'content': [{'type': 'text', 'text': f"Pools:\n{format_page(page, opts)}"}]}
+    data = await f5_request('GET', '/pool', opts, cache_ttl=READ_CACHE_TTLS['listAllPoolStat'])
+    return {'content': [{'type': 'text', 'text': f"All Pools:\n{format_result(data, opts)}"}]}
 
 async def run_create_virtual_server(opts):
     virtual_name = opts.get('virtual_name')
@@ -184,14 +2175,29 @@ async def run_create_virtual_server(opts):
         
     cfg = {
         'name': virtual_name,
-        'destination': f"{ip}:{port}",
-        'mask': '255.255.255.255',
+        'destination': virtual_destination(ip, port),
+        'mask': 'ffff:ffff:ffff:ffff:ffff:ffff:ffff:ffff' if ':' in ip else '255.255.255.255',
         'ipProtocol': 'tcp',
         'profiles': [{'name': 'tcp'}]
     }
     if pool_name:
         cfg['pool'] = pool_name
-        
+
+    def check(ix: LtmConfigIndex) -> List[str]:
+        problems = []
+        if ltm_full_path(virtual_name) in ix.virtuals:
+            problems.append(f"virtual server {ltm_full_path(virtual_name)} already exists")
+        if pool_name and ltm_full_path(pool_name) not in ix.pools:
+            problems.append(f"pool {ltm_full_path(pool_name)} does not exist")
+        destination = cfg['destination']
+        for path, v in sorted(ix.virtuals.items()):
+            if (v['destination'] or '').rpartition('/')[2] == destination and v.get('ipProtocol') in (None, 'tcp', 'any'):
+                problems.append(f"destination {destination} is already used by {path}")
+        return problems
+
+    index = await preflight('createVirtualServer', opts, check)
+    if opts.get('dry_run'):
+        return dry_run_result('createVirtualServer', [('POST', '/virtual', cfg)], opts, config_index_note(index))
     await f5_request('POST', '/virtual', opts, cfg)
     return {'content': [{'type': 'text', 'text': f"OK Virtual Server '{virtual_name}' created."}]}
 
@@ -200,6 +2206,11 @@ async def run_delete_virtual_server(opts):
     if not virtual_name: raise ValueError('Missing virtual_name')
     import urllib.parse
     encoded_name = urllib.parse.quote(virtual_name)
+    virtual = ltm_full_path(virtual_name)
+    index = await preflight('deleteVirtualServer', opts,
+                            lambda ix: [f"virtual server {virtual} does not exist"] if virtual not in ix.virtuals else [])
+    if opts.get('dry_run'):
+        return dry_run_result('deleteVirtualServer', [('DELETE', f"/virtual/~Common~{encoded_name}", None)], opts, config_index_note(index))
     await f5_request('DELETE', f"/virtual/~Common~{encoded_name}", opts)
     return {'content': [{'type': 'text', 'text': f"OK Virtual Server '{virtual_name}' deleted."}]}
 
@@ -229,19 +2240,162 @@ async def run_get_pool_member_status(opts):
         status = 'up' if avail.lower() == 'available' else 'down'
         rows.append({'address': address, 'port': port, 'status': status})
         
-    return {'content': [{'type': 'text', 'text': f"OK Pool '{pool_name}' members: {json.dumps(rows)}"}]}
+    return {'content': [{'type': 'text', 'text': f"OK Pool '{pool_name}' members: {json_dumps(rows)}"}]}
+
+MEMBER_AVAILABILITY = {
+    'up': 'available',
+    'down': 'offline',
+    'user-down': 'forced-offline',
+    'unchecked': 'unknown',
+    'checking': 'unknown',
+}
+
+def iter_pool_member_rows(pools: List[dict]):
+    for pool in pools:
+        pool_name = pool.get('fullPath') or pool.get('name')
+        for m in (pool.get('membersReference') or {}).get('items') or []:
+            address, port = member_address_port(m)
+            address, port = address or 'unknown', port or 'unknown'
+            state = m.get('state', 'unknown')
+            session = 'disabled' if m.get('session') == 'user-disabled' else 'enabled'
+            yield pool_name, address, port, MEMBER_AVAILABILITY.get(state, state), session
+
+async def run_get_all_pool_member_status(opts):
+    only_down = bool(opts.get('only_down'))
+    max_rows = int(opts.get('max_rows') or 1000)
+    params = {'expandSubcollections': 'true', '$select': 'name,partition,fullPath,membersReference'}
+    if opts.get('partition'):
+        params['$filter'] = f"partition eq {opts['partition']}"
+    qs = urllib.parse.urlencode(params, safe='$,', quote_via=urllib.parse.quote)
+
+    # One request returns every pool with its members inlined
+    report_progress(0, 2, 'Fetching pools with members')
+    data = await f5_request('GET', f"/pool?{qs}", opts) or {}
+    pools = data.get('items', [])
+    report_progress(1, 2, f"Fetched {len(pools)} pools")
+
+    lines = ['pool,address,port,availability,session']
+    total = down = 0
+    for row in iter_pool_member_rows(pools):
+        total += 1
+        is_down = row[3] in ('offline', 'forced-offline') or row[4] == 'disabled'
+        down += is_down
+        if only_down and not is_down:
+            continue
+        if len(lines) <= max_rows:
+            lines.append(','.join(str(v) for v in row))
+    shown = len(lines) - 1
+    summary = f"OK {len(pools)} pools, {total} members, {down} down or disabled"
+    if only_down:
+        summary += ", showing down/disabled only"
+    if shown < (down if only_down else total):
+        summary += f" (first {shown} rows)"
+    return {'content': [{'type': 'text', 'text': summary + '\n' + '\n'.join(lines)}]}
+
+LOG_SEVERITIES = {
+    'emerg': 0, 'alert': 1, 'crit': 2, 'err': 3, 'error': 3,
+    'warning': 4, 'warn': 4, 'notice': 5, 'info': 6, 'debug': 7,
+}
+_LOG_SEVERITY_RE = re.compile(r'\b(emerg|alert|crit|err|error|warning|warn|notice|info|debug)\b')
+_SYSLOG_TS_RE = re.compile(r'^([A-Z][a-z]{2})\s+(\d{1,2}) (\d{2}):(\d{2}):(\d{2})')
+_ISO_TS_RE = re.compile(r'^(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2}):(\d{2})')
+_MONTHS = {m: i for i, m in enumerate(('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'), 1)}
+
+def log_line_timestamp(line: str) -> Optional[str]:
+    # Returns the tmsh range format YYYY-MM-DD:HH:MM:SS
+    m = _ISO_TS_RE.match(line)
+    if m:
+        return f"{m[1]}-{m[2]}-{m[3]}:{m[4]}:{m[5]}:{m[6]}"
+    m = _SYSLOG_TS_RE.match(line)
+    if m and m[1] in _MONTHS:
+        now = datetime.now()
+        month = _MONTHS[m[1]]
+        # Syslog lines carry no year; a month ahead of today belongs to last year
+        year = now.year - 1 if month > now.month else now.year
+        return f"{year}-{month:02d}-{int(m[2]):02d}:{m[3]}:{m[4]}:{m[5]}"
+    return None
+
+def iter_log_lines(data: Any):
+    if not isinstance(data, dict):
+        return
+    raw = (data.get('apiRawValues') or {}).get('apiAnonymous')
+    if isinstance(raw, str):
+        start = 0
+        while start < len(raw):
+            end = raw.find('\n', start)
+            if end == -1:
+                end = len(raw)
+            if end > start:
+                yield raw[start:end]
+            start = end + 1
+        return
+    for key, e in (data.get('entries') or {}).items():
+        if key == 'logline' and isinstance(e, dict):
+            yield e.get('description', '')
+            continue
+        nested = (e.get('nestedStats') or {}) if isinstance(e, dict) else {}
+        yield from iter_log_lines(nested)
 
 async def run_get_ltm_logs(opts):
-    start_time = opts.get('start_time')
-    end_time = opts.get('end_time')
+    cursor = decode_cursor(opts['cursor']) if opts.get('cursor') else None
+    start_time = cursor.get('since') if cursor else opts.get('start_time')
+    end_time = opts.get('end_time') or ('now' if cursor else None)
     if not start_time or not end_time: raise ValueError('Missing start_time or end_time')
     
     range_str = f"{start_time}--{end_time}"
     import urllib.parse
     path = f"/log/ltm/stats?options=range,{urllib.parse.quote(range_str)}"
-    
+
+    line_mode = any(opts.get(k) is not None for k in ('severity', 'pattern', 'max_lines', 'cursor'))
+    if not line_mode:
+        logs = await f5_request_sys('GET', path, None, opts)
+        return {'content': [{'type': 'text', 'text': f"LTM Logs from {start_time} to {end_time}:\n{format_result(logs, opts)}"}]}
+
+    max_severity = LOG_SEVERITIES[opts['severity']] if opts.get('severity') else None
+    # Plain substring: a caller-supplied regex could backtrack for minutes on the event loop
+    pattern = opts['pattern'].lower() if opts.get('pattern') else None
+    max_lines = max(1, min(int(opts.get('max_lines') or LOG_DEFAULT_MAX_LINES), LOG_MAX_LINES))
+
+    report_progress(0, 2, f"Fetching LTM logs from {start_time} to {end_time}")
     logs = await f5_request_sys('GET', path, None, opts)
-    return {'content': [{'type': 'text', 'text': f"LTM Logs from {start_time} to {end_time}:\n{json.dumps(logs, indent=2)}"}]}
+    report_progress(1, 2, 'Filtering log lines')
+
+    # Lines at the cursor's second were already consumed by the previous call
+    skip = cursor.get('skip', 0) if cursor else 0
+    last_ts, last_ts_count = (start_time, skip) if cursor else (None, 0)
+    matched = []
+    scanned = 0
+    for line in iter_log_lines(logs):
+        ts = log_line_timestamp(line) or last_ts
+        if cursor and ts:
+            if ts < cursor['since']:
+                continue
+            if ts == cursor['since'] and skip > 0:
+                skip -= 1
+                continue
+        if len(matched) >= max_lines:
+            break
+        scanned += 1
+        if ts == last_ts:
+            last_ts_count += 1
+        else:
+            last_ts, last_ts_count = ts, 1
+        if max_severity is not None:
+            sev = _LOG_SEVERITY_RE.search(line)
+            if not sev or LOG_SEVERITIES[sev[1]] > max_severity:
+                continue
+        if pattern and pattern not in line.lower():
+            continue
+        matched.append(line)
+
+    next_cursor = encode_cursor({'since': last_ts, 'skip': last_ts_count}) if last_ts else opts.get('cursor')
+    header = f"LTM Logs from {start_time} to {end_time}: {len(matched)} lines matched, {scanned} scanned"
+    if len(matched) >= max_lines:
+        header += f" (capped at {max_lines}, continue with the cursor)"
+    text = header + '\n' + '\n'.join(matched)
+    if next_cursor:
+        text += f"\ncursor: {next_cursor}"
+    return {'content': [{'type': 'text', 'text': text}]}
 
 async def run_add_irules(opts):
     irule_name = opts.get('irule_name')
@@ -254,6 +2408,9 @@ async def run_add_irules(opts):
         'partition': partition,
         'apiAnonymous': irule_code
     }
+    if opts.get('dry_run'):
+        # iRules are not in the config index; the device checks the name and the code
+        return dry_run_result('addIrules', [('POST', '/rule', body)], opts, "(not checked: iRules are not in the config index)")
     await f5_request('POST', '/rule', opts, body)
     return {'content': [{'type': 'text', 'text': f"OK iRule '{irule_name}' created."}]}
 
@@ -274,38 +2431,356 @@ async def run_update_member_stat(opts):
         'state': 'user-up',
         'session': 'user-enabled' if action == 'enable' else 'user-disabled'
     }
-    
+
+    # Member PUTs leave the index clean, so a burst of state changes stays cheap to check
+    pool = ltm_full_path(pool_name)
+    index = await preflight('updateMemberStat', opts, lambda ix: member_problems(ix, pool, member_address, member_port), (pool,))
+    if opts.get('dry_run'):
+        return dry_run_result('updateMemberStat', [('PUT', f"/pool/{pool_fq}/members/{member_id}", body)], opts, config_index_note(index))
     await f5_request('PUT', f"/pool/{pool_fq}/members/{member_id}", opts, body)
     verb = 'enabled' if action == 'enable' else 'disabled'
     return {'content': [{'type': 'text', 'text': f"OK, member {member_address}:{member_port} {verb}."}]}
 
+MEMBER_STATE_BODIES = {
+    'enable': {'state': 'user-up', 'session': 'user-enabled'},
+    'disable': {'state': 'user-up', 'session': 'user-disabled'},
+    'force-offline': {'state': 'user-down', 'session': 'user-disabled'},
+}
+
+async def run_bulk_update_member_state(opts):
+    address = opts.get('address')
+    port = opts.get('port')
+    action = opts.get('action')
+    mode = opts.get('mode') or 'concurrent'
+    if not address or action not in MEMBER_STATE_BODIES:
+        raise ValueError('Missing address or invalid action')
+    if mode not in ('concurrent', 'transaction'):
+        raise ValueError('mode must be concurrent or transaction')
+
+    # One fresh expanded pool listing rather than the config index: a drain must not miss a membership added
+    # out of band since the last sync, and the caller never has to search pools first
+    listing = await f5_request('GET', f"/pool?expandSubcollections=true&$select={POOL_INDEX_SELECT}", dict(opts, bypass_cache=True))
+    index = LtmConfigIndex()
+    ConfigIndexRegistry._set_pools(index, (listing or {}).get('items', []))
+    checked = f"pools checked ({len(index.pools)}): {' '.join(sorted(index.pools))}"
+    memberships = []
+    for pool, member, _ in index.member_usage(address, port):
+        key = tuple(member.rsplit(':', 1))
+        member_path = index.pools[pool]['member_paths'].get(key) or f"/{pool.split('/')[1]}/{member}"
+        path = f"/pool/{urllib.parse.quote(pool.replace('/', '~'))}/members/{urllib.parse.quote(member_path.replace('/', '~'))}"
+        memberships.append((pool, member, path))
+    target = f"{address}:{port}" if port is not None else address
+    if not memberships:
+        raise ValueError(f"{target} is not a member of any pool; {checked}")
+
+    body = MEMBER_STATE_BODIES[action]
+    if opts.get('dry_run'):
+        calls = [('PUT', path, body) for _, _, path in memberships]
+        return dry_run_result('bulkUpdateMemberState', calls, opts, f"({mode}) {checked}")
+    results = {}
+    if mode == 'transaction':
+        report_progress(0, 1, f"Committing {len(memberships)} updates in one transaction")
+        try:
+            await f5_transaction(opts, [('PUT', path, body) for _, _, path in memberships])
+            outcome = 'ok'
+        except Exception as e:
+            outcome = f"failed: {e}"
+        results = {(pool, member): outcome for pool, member, _ in memberships}
+        report_progress(1, 1, f"Transaction {'committed' if outcome == 'ok' else 'failed'}")
+    else:
+        done = 0
+
+        async def update(pool: str, member: str, path: str):
+            nonlocal done
+            try:
+                await f5_request('PUT', path, opts, body)
+                results[(pool, member)] = 'ok'
+            except Exception as e:
+                results[(pool, member)] = f"failed: {e}"
+            done += 1
+            report_progress(done, len(memberships), f"{pool} {member}: {results[(pool, member)]}")
+
+        await asyncio.gather(*[update(*m) for m in memberships])
+
+    ok = sum(1 for r in results.values() if r == 'ok')
+    lines = [f"{'OK' if ok == len(memberships) else 'PARTIAL' if ok else 'FAILED'} {action} {target}: "
+             f"{ok} of {len(memberships)} memberships updated ({mode})", 'pool,member,result']
+    lines += [f"{pool},{member},{results[(pool, member)]}" for pool, member, _ in memberships]
+    lines.append(checked)
+    return {'content': [{'type': 'text', 'text': '\n'.join(lines)}]}
+
 async def run_get_cpu_stat(opts):
     if not all(k in opts for k in ['f5_url', 'f5_username', 'f5_password']):
         raise ValueError('Missing credentials')
-    data = await f5_request_sys('GET', '/cpu', None, opts)
-    return {'content': [{'type': 'text', 'text': f"CPU Stats:\n{json.dumps(data, indent=2)}"}]}
+    data = await f5_request_sys('GET', '/cpu', None, opts, cache_ttl=READ_CACHE_TTLS['getCpuStat'])
+    return {'content': [{'type': 'text', 'text': f"CPU Stats:\n{format_result(data, opts)}"}]}
 
 async def run_list_all_virtual(opts):
     if not all(k in opts for k in ['f5_url', 'f5_username', 'f5_password']):
         raise ValueError('Missing credentials')
-    data = await f5_request('GET', '/virtual', opts)
-    return {'content': [{'type': 'text', 'text': f"All Virtual Servers:\n{json.dumps(data, indent=2)}"}]}
+    if is_paged_request(opts):
+        page = await fetch_collection_page('/virtual', opts, cache_ttl=READ_CACHE_TTLS['listAllVirtual'])
+        return {'content': [{'type': 'text', 'text': f"Virtual Servers:\n{format_page(page, opts)}"}]}
+    data = await f5_request('GET', '/virtual', opts, cache_ttl=READ_CACHE_TTLS['listAllVirtual'])
+    return {'content': [{'type': 'text', 'text': f"All Virtual Servers:\n{format_result(data, opts)}"}]}
 
 async def run_get_tmm_info(opts):
-    data = await f5_request_sys('GET', '/tmm-info', None, opts)
-    return {'content': [{'type': 'text', 'text': f"TMM Info:\n{json.dumps(data, indent=2)}"}]}
+    data = await f5_request_sys('GET', '/tmm-info', None, opts, cache_ttl=READ_CACHE_TTLS['getTmmInfo'])
+    return {'content': [{'type': 'text', 'text': f"TMM Info:\n{format_result(data, opts)}"}]}
 
 async def run_get_connection(opts):
     data = await f5_request_sys('GET', '/performance/connections/stats', None, opts)
-    return {'content': [{'type': 'text', 'text': f"Connection Info:\n{json.dumps(data, indent=2)}"}]}
+    return {'content': [{'type': 'text', 'text': f"Connection Info:\n{format_result(data, opts)}"}]}
 
 async def run_get_certificate_stat(opts):
-    data = await f5_request_sys('GET', '/crypto/cert', None, opts)
-    return {'content': [{'type': 'text', 'text': f"Certification Info:\n{json.dumps(data, indent=2)}"}]}
+    data = await f5_request_sys('GET', '/crypto/cert', None, opts, cache_ttl=READ_CACHE_TTLS['getCertificateStat'])
+    return {'content': [{'type': 'text', 'text': f"Certification Info:\n{format_result(data, opts)}"}]}
+
+def require_single_worker(tool: str):
+    # Samples live in the worker that registered the device; other workers could neither see nor stop them
+    if SERVER_WORKERS > 1:
+        raise ValueError(f"{tool} is not available with --workers {SERVER_WORKERS}; run a single worker to use the stats collector")
+
+async def run_register_stats_device(opts):
+    require_single_worker('registerStatsDevice')
+    pools = opts.get('pools') or []
+    interval = opts.get('interval') or STATS_DEFAULT_INTERVAL
+    device = await stats_collector.register(opts, interval, pools)
+    text = f"OK Sampling {opts.get('f5_url')} every {device['interval']:g}s ({len(device['pools'])} pools)."
+    problems = list(device['errors'].items()) + ([('sample', device['last_error'])] if device['last_error'] else [])
+    if problems:
+        text += '\nFirst sample errors:\n' + '\n'.join(f"  {source}: {error}" for source, error in problems)
+    return {'content': [{'type': 'text', 'text': text}]}
+
+async def run_unregister_stats_device(opts):
+    require_single_worker('unregisterStatsDevice')
+    if not stats_collector.get(opts):
+        raise ValueError(f"Device {opts.get('f5_url')} is not registered with these credentials")
+    stats_collector.unregister(opts['f5_url'].rstrip('/'))
+    return {'content': [{'type': 'text', 'text': f"OK Stopped sampling {opts.get('f5_url')}."}]}
+
+async def run_get_stats_trend(opts):
+    require_single_worker('getStatsTrend')
+    device = stats_collector.get(opts)
+    if not device:
+        raise ValueError(f"Device {opts.get('f5_url')} is not registered; call registerStatsDevice first")
+    window = float(opts.get('window_seconds') or 300)
+    trend = stats_collector.trend(device, window, opts.get('metric_prefix'))
+    return {'content': [{'type': 'text', 'text': json_dumps(trend)}]}
+
+def config_index_note(index: LtmConfigIndex) -> str:
+    return f"(config index: {len(index.pools)} pools, {len(index.virtuals)} virtuals, membership listed {time.monotonic() - index.members_synced:.0f}s ago)"
+
+async def run_find_member_usage(opts):
+    address = opts.get('address')
+    port = opts.get('port')
+    if not address: raise ValueError('Missing address')
+    index = await config_index.get(opts, refresh=bool(opts.get('refresh')))
+    rows = index.member_usage(address, port)
+    target = f"{address}:{port}" if port is not None else address
+    virtuals = {v for _, _, vs in rows for v in vs}
+    lines = [f"OK {target}: {len(rows)} pool memberships, {len(virtuals)} virtual servers {config_index_note(index)}",
+             'pool,member,virtuals']
+    lines += [f"{pool},{member},{' '.join(vs)}" for pool, member, vs in rows]
+    return {'content': [{'type': 'text', 'text': '\n'.join(lines)}]}
+
+async def run_find_empty_pools(opts):
+    index = await config_index.get(opts, refresh=bool(opts.get('refresh')))
+    rows = index.empty_pools()
+    lines = [f"OK {len(rows)} pools without members {config_index_note(index)}", 'pool,virtuals']
+    lines += [f"{pool},{' '.join(vs)}" for pool, vs in rows]
+    return {'content': [{'type': 'text', 'text': '\n'.join(lines)}]}
+
+async def run_get_virtuals_by_pool(opts):
+    pool_name = opts.get('pool_name')
+    if not pool_name: raise ValueError('Missing pool_name')
+    index = await config_index.get(opts, refresh=bool(opts.get('refresh')))
+    pool = ltm_full_path(pool_name, opts.get('partition') or 'Common')
+    if pool not in index.pools:
+        raise ValueError(f"Pool {pool} not found {config_index_note(index)}")
+    paths = sorted(index.virtuals_by_pool.get(pool, ()))
+    lines = [f"OK {pool}: {len(paths)} virtual servers, {len(index.pools[pool]['members'])} members {config_index_note(index)}",
+             'virtual,destination']
+    lines += [f"{path},{index.virtuals[path]['destination']}" for path in paths]
+    return {'content': [{'type': 'text', 'text': '\n'.join(lines)}]}
+
+CERT_ROW_HEADER = 'cert,expires,days_left,cn'
+
+def cert_rows(certs: List[dict], now: float, max_rows: int) -> List[str]:
+    rows = []
+    for c in certs[:max_rows]:
+        if c['expires']:
+            rows.append(f"{c['path']},{time.strftime('%Y-%m-%d', time.gmtime(c['expires']))},{math.floor((c['expires'] - now) / 86400)},{c['cn']}")
+        else:
+            rows.append(f"{c['path']},unknown,,{c['cn']}")
+    return rows
+
+def cert_index_note(index: CertIndex) -> str:
+    return f"(cert index: {len(index.certs)} certs, synced {time.monotonic() - index.synced:.0f}s ago)"
+
+async def run_get_expiring_certificates(opts):
+    days = float(opts.get('days') if opts.get('days') is not None else 30)
+    max_rows = int(opts.get('max_rows') or 200)
+    index = await cert_index.get(opts, refresh=bool(opts.get('refresh')))
+    now = time.time()
+    certs = index.expiring(now + days * 86400)
+    if opts.get('include_expired') is False:
+        certs = [c for c in certs if c['expires'] > now]
+    if opts.get('partition'):
+        certs = [c for c in certs if c['partition'] == opts['partition']]
+    expired = sum(1 for c in certs if c['expires'] <= now)
+    header = f"OK {len(certs)} certificates expire within {days:g} days ({expired} already expired) {cert_index_note(index)}"
+    if index.unknown_expiry:
+        header += f" ({len(index.unknown_expiry)} with unknown expiry not listed)"
+    if len(certs) > max_rows:
+        header += f" (first {max_rows} rows)"
+    return {'content': [{'type': 'text', 'text': '\n'.join([header, CERT_ROW_HEADER] + cert_rows(certs, now, max_rows))}]}
+
+async def run_find_certificates(opts):
+    query = opts.get('query')
+    if not query: raise ValueError('Missing query')
+    max_rows = int(opts.get('max_rows') or 200)
+    index = await cert_index.get(opts, refresh=bool(opts.get('refresh')))
+    certs = index.find(query)
+    header = f"OK {len(certs)} certificates match '{query}' {cert_index_note(index)}"
+    if len(certs) > max_rows:
+        header += f" (first {max_rows} rows)"
+    return {'content': [{'type': 'text', 'text': '\n'.join([header, CERT_ROW_HEADER] + cert_rows(certs, time.time(), max_rows))}]}
+
+async def run_get_certificate_counts(opts):
+    days = float(opts.get('days') if opts.get('days') is not None else 30)
+    index = await cert_index.get(opts, refresh=bool(opts.get('refresh')))
+    counts = index.partition_counts(time.time(), days * 86400)
+    lines = [f"OK {len(index.certs)} certificates in {len(counts)} partitions {cert_index_note(index)}",
+             f"partition,total,expired,expiring_{days:g}d,unknown_expiry"]
+    lines += [f"{p},{c['total']},{c['expired']},{c['expiring']},{c['unknown']}" for p, c in counts.items()]
+    return {'content': [{'type': 'text', 'text': '\n'.join(lines)}]}
+
+# Mutation tools that accept "async": true
+JOB_TOOLS = [
+    "configurePool", "removeMember", "deletePool", "createVirtualServer", "deleteVirtualServer",
+    "updateMemberStat", "bulkUpdateMemberState", "addIrules",
+]
+
+async def run_get_job_status(opts):
+    job_id = opts.get('job_id') or ''
+    job = jobs.get(job_id)
+    record = jobs.view(job) if job else await jobs.get_shared(job_id)
+    if not record:
+        raise ValueError(f"Unknown or expired job: {job_id}")
+    return {'content': [{'type': 'text', 'text': json_dumps(record)}]}
+
+async def run_cancel_job(opts):
+    job_id = opts.get('job_id') or ''
+    job = jobs.get(job_id)
+    if not job:
+        # Started by another worker: flag it for that worker to cancel
+        record = await jobs.get_shared(job_id)
+        if not record:
+            raise ValueError(f"Unknown or expired job: {job_id}")
+        if record['status'] not in ('queued', 'running'):
+            return {'content': [{'type': 'text', 'text': f"Job {job_id} already {record['status']}."}]}
+        await asyncio.to_thread(shared_store.request_job_cancel, job_id)
+        return {'content': [{'type': 'text', 'text': f"OK cancellation of job {job_id} requested."}]}
+    if not jobs.cancel(job_id):
+        return {'content': [{'type': 'text', 'text': f"Job {job_id} already {job['status']}."}]}
+    return {'content': [{'type': 'text', 'text': f"OK job {job_id} cancelled."}]}
+
+# Read-only tools that fleetInvoke may fan out
+FLEET_TOOLS = [
+    "getCpuStat", "getConnection", "getTmmInfo", "getPoolMemberStatus", "getAllPoolMemberStatus",
+    "listAllPoolStat", "listAllVirtual", "getCertificateStat", "getLtmLogs",
+]
+
+def fleet_result(text: str) -> Any:
+    # Tool text is JSON, often after a "Label:" line or prefix: embed the JSON itself, not a doubly encoded
+    # string. Tables, log lines and truncated output stay text.
+    for candidate in (text, text.partition('\n')[2], text.partition(': ')[2]):
+        if candidate[:1] in ('{', '['):
+            try:
+                return json_loads(candidate)
+            except ValueError:
+                pass
+    return text
+
+async def run_fleet_invoke(opts):
+    tool_name = opts.get('tool')
+    devices = opts.get('devices')
+    if tool_name not in FLEET_TOOLS:
+        raise ValueError(f"tool must be one of {FLEET_TOOLS}")
+    if not isinstance(devices, list) or not devices:
+        raise ValueError('Missing devices')
+
+    tool = tools_by_name[tool_name]
+    concurrency = max(1, min(int(opts.get('concurrency') or FLEET_DEFAULT_CONCURRENCY), FLEET_MAX_CONCURRENCY))
+    timeout = float(opts.get('timeout') or FLEET_DEFAULT_TIMEOUT)
+    base_args = dict(opts.get('arguments') or {})
+    for k in ('f5_username', 'f5_password'):
+        if opts.get(k):
+            base_args.setdefault(k, opts[k])
+    # Dozens of devices: single-line JSON without boilerplate unless the caller chose a format
+    if 'format' in tool['inputSchema']['properties']:
+        base_args.setdefault('format', 'compact')
+
+    # One entry per device URL; later duplicates are ignored
+    targets = OrderedDict()
+    for d in devices:
+        url = (d.get('f5_url') or '').rstrip('/')
+        if url and url not in targets:
+            targets[url] = dict(base_args, **d)
+
+    sem = asyncio.Semaphore(concurrency)
+    done = 0
+
+    async def invoke_one(args: dict) -> dict:
+        errors = validate_tool_args(tool_name, args)
+        if errors:
+            return {'ok': False, 'error': '; '.join(errors)}
+        async with sem:
+            started = time.monotonic()
+            try:
+                result = await asyncio.wait_for(tool['handler'](args), timeout)
+            except asyncio.TimeoutError:
+                return {'ok': False, 'error': f"timed out after {timeout:g}s"}
+            except Exception as e:
+                return {'ok': False, 'error': str(e)}
+            text = '\n'.join(c.get('text', '') for c in result.get('content', []))
+            return {'ok': True, 'ms': round((time.monotonic() - started) * 1000), 'result': fleet_result(text)}
+
+    async def run_one(url: str, args: dict):
+        nonlocal done
+        # Per-device handlers stay silent; progress is reported once per device
+        silenced = progress_reporter.set(None)
+        try:
+            outcome = await invoke_one(args)
+        finally:
+            progress_reporter.reset(silenced)
+        done += 1
+        report_progress(done, len(targets), f"{url}: {'ok' if outcome['ok'] else 'failed'}")
+        return url, outcome
+
+    results = dict(await asyncio.gather(*[run_one(url, args) for url, args in targets.items()]))
+    ok = sum(1 for r in results.values() if r['ok'])
+    merged = {'tool': tool_name, 'devices': len(results), 'ok': ok, 'failed': len(results) - ok, 'results': results}
+    return {'content': [{'type': 'text', 'text': json_dumps(merged)}]}
 
 
 # ===== Tools Definitions =====
 
+# Options of the tools that change device config
+MUTATION_PROPERTIES = {
+    "async": {"type": "boolean", "description": "Run as a background job and return a job id at once (see getJobStatus)"},
+    "dry_run": {"type": "boolean", "description": "Check the change against the cached config and return the REST calls it would make, without sending them"},
+    "refresh": {"type": "boolean", "description": "Force a full re-download of the config index before checking"},
+}
+
+# Output controls of the tools that return device JSON
+OUTPUT_FORMAT_PROPERTIES = {
+    "format": {"type": "string", "enum": ["json", "compact", "table"],
+               "description": "json: raw device JSON; compact: single-line JSON without kind/selfLink/generation; table: CSV rows (fewest tokens)"},
+    "max_chars": {"type": "integer", "description": "Output budget for compact/table (default 32000); longer output is truncated with a pointer to the rest"},
+}
+
 tools_list = [
     {
         "name": "configurePool",
@@ -324,7 +2799,8 @@ tools_list = [
                         },
                         "required": ["address", "port"]
                     }
-                }
+                },
+                **MUTATION_PROPERTIES
             },
             "required": ["f5_url", "f5_username", "f5_password", "pool_name", "members"]
         },
@@ -332,11 +2808,19 @@ tools_list = [
     },
     {
         "name": "listAllPoolStat",
-        "description": "List all pool stats",
+        "description": "List all pool stats. Pass fields/filter/partition/top/skip to get a compact page with a next_cursor",
         "inputSchema": {
              "type": "object",
              "properties": {
-                "f5_url": {"type": "string"}, "f5_username": {"type": "string"}, "f5_password": {"type": "string"}
+                "f5_url": {"type": "string"}, "f5_username": {"type": "string"}, "f5_password": {"type": "string"},
+                **OUTPUT_FORMAT_PROPERTIES,
+                "bypass_cache": {"type": "boolean", "description": "Skip the read cache and fetch fresh data from the device"},
+                "fields": {"type": "array", "items": {"type": "string"}, "description": "Only return these properties (e.g. name, destination, pool)"},
+                "filter": {"type": "string", "description": "Case-insensitive name match; supports * and ? wildcards"},
+                "partition": {"type": "string", "description": "Only return objects in this partition"},
+                "top": {"type": "integer", "description": "Page size (default 100, max 1000)"},
+                "skip": {"type": "integer", "description": "Number of items to skip"},
+                "cursor": {"type": "string", "description": "next_cursor from a previous page"}
              },
              "required": ["f5_url", "f5_username", "f5_password"]
         },
@@ -349,7 +2833,8 @@ tools_list = [
             "type": "object",
              "properties": {
                 "f5_url": {"type": "string"}, "f5_username": {"type": "string"}, "f5_password": {"type": "string"},
-                "pool_name": {"type": "string"}, "member_address": {"type": "string"}, "member_port": {"type": "integer"}
+                "pool_name": {"type": "string"}, "member_address": {"type": "string"}, "member_port": {"type": "integer"},
+                **MUTATION_PROPERTIES
              },
              "required": ["f5_url", "f5_username", "f5_password", "pool_name", "member_address", "member_port"]
         },
@@ -362,7 +2847,8 @@ tools_list = [
             "type": "object",
              "properties": {
                 "f5_url": {"type": "string"}, "f5_username": {"type": "string"}, "f5_password": {"type": "string"},
-                "pool_name": {"type": "string"}
+                "pool_name": {"type": "string"},
+                **MUTATION_PROPERTIES
              },
              "required": ["f5_url", "f5_username", "f5_password", "pool_name"]
         },
@@ -375,7 +2861,8 @@ tools_list = [
             "type": "object",
              "properties": {
                 "f5_url": {"type": "string"}, "f5_username": {"type": "string"}, "f5_password": {"type": "string"},
-                "virtual_name": {"type": "string"}, "ip": {"type": "string"}, "port": {"type": "integer"}, "pool_name": {"type": "string"}
+                "virtual_name": {"type": "string"}, "ip": {"type": "string"}, "port": {"type": "integer"}, "pool_name": {"type": "string"},
+                **MUTATION_PROPERTIES
              },
              "required": ["f5_url", "f5_username", "f5_password", "virtual_name", "ip", "port"]
         },
@@ -388,7 +2875,8 @@ tools_list = [
             "type": "object",
              "properties": {
                 "f5_url": {"type": "string"}, "f5_username": {"type": "string"}, "f5_password": {"type": "string"},
-                "virtual_name": {"type": "string"}
+                "virtual_name": {"type": "string"},
+                **MUTATION_PROPERTIES
              },
              "required": ["f5_url", "f5_username", "f5_password", "virtual_name"]
         },
@@ -407,16 +2895,37 @@ tools_list = [
         },
         "handler": run_get_pool_member_status
     },
+    {
+        "name": "getAllPoolMemberStatus",
+        "description": "Health sweep of every pool member in one call: compact rows of pool, address, port, availability and session",
+        "inputSchema": {
+            "type": "object",
+             "properties": {
+                "f5_url": {"type": "string"}, "f5_username": {"type": "string"}, "f5_password": {"type": "string"},
+                "only_down": {"type": "boolean", "description": "Only return members that are offline, forced offline or disabled"},
+                "partition": {"type": "string", "description": "Only pools in this partition"},
+                "max_rows": {"type": "integer", "description": "Maximum rows returned (default 1000)"}
+             },
+             "required": ["f5_url", "f5_username", "f5_password"]
+        },
+        "handler": run_get_all_pool_member_status
+    },
     {
         "name": "getLtmLogs",
-        "description": "Retrieve LTM logs within a specified time range",
+        "description": "Retrieve LTM logs within a specified time range. Pass severity/pattern/max_lines to get filtered log lines plus a cursor; pass the cursor back to tail new entries",
         "inputSchema": {
             "type": "object",
              "properties": {
                 "f5_url": {"type": "string"}, "f5_username": {"type": "string"}, "f5_password": {"type": "string"},
-                "start_time": {"type": "string"}, "end_time": {"type": "string"}
+                **OUTPUT_FORMAT_PROPERTIES,
+                "start_time": {"type": "string", "description": "YYYY-MM-DD:HH:MM:SS (optional with cursor)"},
+                "end_time": {"type": "string", "description": "YYYY-MM-DD:HH:MM:SS or now (defaults to now with cursor)"},
+                "severity": {"type": "string", "enum": ["emerg", "alert", "crit", "err", "warning", "notice", "info", "debug"], "description": "Only lines at this severity or worse"},
+                "pattern": {"type": "string", "description": "Case-insensitive text the line must contain"},
+                "max_lines": {"type": "integer", "description": "Maximum lines returned (default 200, max 5000)"},
+                "cursor": {"type": "string", "description": "cursor from a previous call; resumes after the last line returned"}
              },
-             "required": ["f5_url", "f5_username", "f5_password", "start_time", "end_time"]
+             "required": ["f5_url", "f5_username", "f5_password"]
         },
         "handler": run_get_ltm_logs
     },
@@ -428,12 +2937,30 @@ tools_list = [
              "properties": {
                 "f5_url": {"type": "string"}, "f5_username": {"type": "string"}, "f5_password": {"type": "string"},
                 "pool_name": {"type": "string"}, "member_address": {"type": "string"}, "member_port": {"type": "integer"},
-                "action": {"type": "string", "enum": ["enable", "disable"]}
+                "action": {"type": "string", "enum": ["enable", "disable"]},
+                **MUTATION_PROPERTIES
              },
              "required": ["f5_url", "f5_username", "f5_password", "pool_name", "member_address", "member_port", "action"]
         },
         "handler": run_update_member_stat
     },
+    {
+        "name": "bulkUpdateMemberState",
+        "description": "Drain or restore a backend in one call: enable, disable or force offline every pool membership of an address (optionally address:port), concurrently or in a single all-or-nothing transaction",
+        "inputSchema": {
+            "type": "object",
+             "properties": {
+                "f5_url": {"type": "string"}, "f5_username": {"type": "string"}, "f5_password": {"type": "string"},
+                "address": {"type": "string", "description": "Member IP address, e.g. 10.1.2.3"},
+                "port": {"type": "integer", "description": "Member port; omit to update every port of the address"},
+                "action": {"type": "string", "enum": ["enable", "disable", "force-offline"]},
+                "mode": {"type": "string", "enum": ["concurrent", "transaction"], "description": "concurrent (default) reports per membership; transaction applies all or none"},
+                **MUTATION_PROPERTIES
+             },
+             "required": ["f5_url", "f5_username", "f5_password", "address", "action"]
+        },
+        "handler": run_bulk_update_member_state
+    },
     {
         "name": "addIrules",
         "description": "Upload an iRule to the F5",
@@ -441,7 +2968,8 @@ tools_list = [
             "type": "object",
              "properties": {
                 "f5_url": {"type": "string"}, "f5_username": {"type": "string"}, "f5_password": {"type": "string"},
-                "irule_name": {"type": "string"}, "irule_code": {"type": "string"}, "partition": {"type": "string"}
+                "irule_name": {"type": "string"}, "irule_code": {"type": "string"}, "partition": {"type": "string"},
+                **MUTATION_PROPERTIES
              },
              "required": ["f5_url", "f5_username", "f5_password", "irule_name", "irule_code"]
         },
@@ -453,7 +2981,9 @@ tools_list = [
         "inputSchema": {
              "type": "object",
              "properties": {
-                "f5_url": {"type": "string"}, "f5_username": {"type": "string"}, "f5_password": {"type": "string"}
+                "f5_url": {"type": "string"}, "f5_username": {"type": "string"}, "f5_password": {"type": "string"},
+                **OUTPUT_FORMAT_PROPERTIES,
+                "bypass_cache": {"type": "boolean", "description": "Skip the read cache and fetch fresh data from the device"}
              },
              "required": ["f5_url", "f5_username", "f5_password"]
         },
@@ -461,11 +2991,19 @@ tools_list = [
     },
     {
         "name": "listAllVirtual",
-        "description": "List all virtual servers",
+        "description": "List all virtual servers. Pass fields/filter/partition/top/skip to get a compact page with a next_cursor",
         "inputSchema": {
              "type": "object",
              "properties": {
-                "f5_url": {"type": "string"}, "f5_username": {"type": "string"}, "f5_password": {"type": "string"}
+                "f5_url": {"type": "string"}, "f5_username": {"type": "string"}, "f5_password": {"type": "string"},
+                **OUTPUT_FORMAT_PROPERTIES,
+                "bypass_cache": {"type": "boolean", "description": "Skip the read cache and fetch fresh data from the device"},
+                "fields": {"type": "array", "items": {"type": "string"}, "description": "Only return these properties (e.g. name, destination, pool)"},
+                "filter": {"type": "string", "description": "Case-insensitive name match; supports * and ? wildcards"},
+                "partition": {"type": "string", "description": "Only return objects in this partition"},
+                "top": {"type": "integer", "description": "Page size (default 100, max 1000)"},
+                "skip": {"type": "integer", "description": "Number of items to skip"},
+                "cursor": {"type": "string", "description": "next_cursor from a previous page"}
              },
              "required": ["f5_url", "f5_username", "f5_password"]
         },
@@ -477,7 +3015,9 @@ tools_list = [
         "inputSchema": {
              "type": "object",
              "properties": {
-                "f5_url": {"type": "string"}, "f5_username": {"type": "string"}, "f5_password": {"type": "string"}
+                "f5_url": {"type": "string"}, "f5_username": {"type": "string"}, "f5_password": {"type": "string"},
+                **OUTPUT_FORMAT_PROPERTIES,
+                "bypass_cache": {"type": "boolean", "description": "Skip the read cache and fetch fresh data from the device"}
              },
              "required": ["f5_url", "f5_username", "f5_password"]
         },
@@ -489,7 +3029,8 @@ tools_list = [
         "inputSchema": {
              "type": "object",
              "properties": {
-                "f5_url": {"type": "string"}, "f5_username": {"type": "string"}, "f5_password": {"type": "string"}
+                "f5_url": {"type": "string"}, "f5_username": {"type": "string"}, "f5_password": {"type": "string"},
+                **OUTPUT_FORMAT_PROPERTIES
              },
              "required": ["f5_url", "f5_username", "f5_password"]
         },
@@ -501,82 +3042,425 @@ tools_list = [
         "inputSchema": {
              "type": "object",
              "properties": {
-                "f5_url": {"type": "string"}, "f5_username": {"type": "string"}, "f5_password": {"type": "string"}
+                "f5_url": {"type": "string"}, "f5_username": {"type": "string"}, "f5_password": {"type": "string"},
+                **OUTPUT_FORMAT_PROPERTIES,
+                "bypass_cache": {"type": "boolean", "description": "Skip the read cache and fetch fresh data from the device"}
              },
              "required": ["f5_url", "f5_username", "f5_password"]
         },
         "handler": run_get_certificate_stat
+    },
+    {
+        "name": "fleetInvoke",
+        "description": "Run one read-only tool against many F5 devices concurrently and return the results keyed by device URL",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "tool": {"type": "string", "enum": FLEET_TOOLS, "description": "Read-only tool to run on every device"},
+                "devices": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "f5_url": {"type": "string"}, "f5_username": {"type": "string"}, "f5_password": {"type": "string"}
+                        },
+                        "required": ["f5_url"]
+                    },
+                    "description": "Target devices; credentials default to the top-level f5_username/f5_password"
+                },
+                "f5_username": {"type": "string"}, "f5_password": {"type": "string"},
+                "arguments": {"type": "object", "description": "Extra tool arguments shared by all devices (e.g. pool_name)"},
+                "concurrency": {"type": "integer", "description": "Devices queried at once (default 10, max 50)"},
+                "timeout": {"type": "number", "description": "Per-device timeout in seconds (default 20)"}
+            },
+            "required": ["tool", "devices"]
+        },
+        "handler": run_fleet_invoke
+    },
+    {
+        "name": "registerStatsDevice",
+        "description": "Start background sampling of a device's connection, throughput, TMM CPU and (optionally) pool member stats into an in-memory time series",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "f5_url": {"type": "string"}, "f5_username": {"type": "string"}, "f5_password": {"type": "string"},
+                "interval": {"type": "number", "description": "Seconds between samples (default 30, min 5)"},
+                "pools": {"type": "array", "items": {"type": "string"}, "description": "Pools whose members are sampled"}
+            },
+            "required": ["f5_url", "f5_username", "f5_password"]
+        },
+        "handler": run_register_stats_device
+    },
+    {
+        "name": "unregisterStatsDevice",
+        "description": "Stop background sampling of a device and drop its samples",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "f5_url": {"type": "string"}, "f5_username": {"type": "string"}, "f5_password": {"type": "string"}
+            },
+            "required": ["f5_url", "f5_username", "f5_password"]
+        },
+        "handler": run_unregister_stats_device
+    },
+    {
+        "name": "getStatsTrend",
+        "description": "Answer from collected samples (no device call): per-second rates for counters (connections, bits) and last/min/max/avg for gauges over a time window",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "f5_url": {"type": "string"}, "f5_username": {"type": "string"}, "f5_password": {"type": "string"},
+                "window_seconds": {"type": "number", "description": "Look-back window (default 300)"},
+                "metric_prefix": {"type": "string", "description": "Only metrics starting with this, e.g. client. or member.web_pool/"}
+            },
+            "required": ["f5_url", "f5_username", "f5_password"]
+        },
+        "handler": run_get_stats_trend
+    },
+    {
+        "name": "getJobStatus",
+        "description": "Status, progress and result of a background job started with \"async\": true",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "job_id": {"type": "string"}
+            },
+            "required": ["job_id"]
+        },
+        "handler": run_get_job_status
+    },
+    {
+        "name": "cancelJob",
+        "description": "Cancel a queued or running background job",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "job_id": {"type": "string"}
+            },
+            "required": ["job_id"]
+        },
+        "handler": run_cancel_job
+    },
+    {
+        "name": "findMemberUsage",
+        "description": "Which pools contain a backend address (optionally address:port), and which virtual servers route to those pools. Answered from a cached config index",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "f5_url": {"type": "string"}, "f5_username": {"type": "string"}, "f5_password": {"type": "string"},
+                "refresh": {"type": "boolean", "description": "Force a full re-download of the config index first"},
+                "address": {"type": "string", "description": "Member IP address, e.g. 10.1.2.3"},
+                "port": {"type": "integer", "description": "Member port; omit to match every port"}
+            },
+            "required": ["f5_url", "f5_username", "f5_password", "address"]
+        },
+        "handler": run_find_member_usage
+    },
+    {
+        "name": "findEmptyPools",
+        "description": "Pools that have no members, with the virtual servers still pointing at them. Answered from a cached config index",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "f5_url": {"type": "string"}, "f5_username": {"type": "string"}, "f5_password": {"type": "string"},
+                "refresh": {"type": "boolean", "description": "Force a full re-download of the config index first"}
+            },
+            "required": ["f5_url", "f5_username", "f5_password"]
+        },
+        "handler": run_find_empty_pools
+    },
+    {
+        "name": "getVirtualsByPool",
+        "description": "Virtual servers whose default pool is the given pool. Answered from a cached config index",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "f5_url": {"type": "string"}, "f5_username": {"type": "string"}, "f5_password": {"type": "string"},
+                "refresh": {"type": "boolean", "description": "Force a full re-download of the config index first"},
+                "pool_name": {"type": "string", "description": "Pool name or full path (/Partition/name)"},
+                "partition": {"type": "string", "description": "Partition of pool_name when it is not a full path (default Common)"}
+            },
+            "required": ["f5_url", "f5_username", "f5_password", "pool_name"]
+        },
+        "handler": run_get_virtuals_by_pool
+    },
+    {
+        "name": "getExpiringCertificates",
+        "description": "Certificates expiring within N days (expired ones included by default), soonest first, as compact rows. Answered from a cached certificate index",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "f5_url": {"type": "string"}, "f5_username": {"type": "string"}, "f5_password": {"type": "string"},
+                "refresh": {"type": "boolean", "description": "Force a full re-download of the certificate index first"},
+                "days": {"type": "number", "description": "Look-ahead window in days (default 30)"},
+                "include_expired": {"type": "boolean", "description": "Include already expired certificates (default true)"},
+                "partition": {"type": "string", "description": "Only certificates in this partition"},
+                "max_rows": {"type": "integer", "description": "Maximum rows returned (default 200)"}
+            },
+            "required": ["f5_url", "f5_username", "f5_password"]
+        },
+        "handler": run_get_expiring_certificates
+    },
+    {
+        "name": "findCertificates",
+        "description": "Find certificates by host name (SAN/CN, wildcards honoured) or by a substring of the subject, SAN or name. Answered from a cached certificate index",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "f5_url": {"type": "string"}, "f5_username": {"type": "string"}, "f5_password": {"type": "string"},
+                "refresh": {"type": "boolean", "description": "Force a full re-download of the certificate index first"},
+                "query": {"type": "string", "description": "Host name such as www.example.com, or any subject/SAN text"},
+                "max_rows": {"type": "integer", "description": "Maximum rows returned (default 200)"}
+            },
+            "required": ["f5_url", "f5_username", "f5_password", "query"]
+        },
+        "handler": run_find_certificates
+    },
+    {
+        "name": "getCertificateCounts",
+        "description": "Per-partition certificate counts: total, expired and expiring within N days. Answered from a cached certificate index",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "f5_url": {"type": "string"}, "f5_username": {"type": "string"}, "f5_password": {"type": "string"},
+                "refresh": {"type": "boolean", "description": "Force a full re-download of the certificate index first"},
+                "days": {"type": "number", "description": "Look-ahead window in days (default 30)"}
+            },
+            "required": ["f5_url", "f5_username", "f5_password"]
+        },
+        "handler": run_get_certificate_counts
     }
 ]
 
+# ===== Tool Registry =====
+# Built once at startup: O(1) lookup, precompiled argument validators, pre-serialized tools/list
+
+_JSON_TYPES = {
+    "string": (str,),
+    "integer": (int,),
+    "number": (int, float),
+    "boolean": (bool,),
+    "array": (list,),
+    "object": (dict,),
+}
 
+def compile_schema(schema: dict) -> Callable[[Any, str], List[str]]:
+    type_name = schema.get('type')
+    expected = _JSON_TYPES.get(type_name)
+    enum = schema.get('enum')
+    required = schema.get('required', [])
+    props = {k: compile_schema(v) for k, v in schema.get('properties', {}).items()}
+    items = compile_schema(schema['items']) if 'items' in schema else None
+    # Objects that declare properties are closed unless they opt out; a misspelt argument is an error, not a no-op
+    closed = 'properties' in schema and not schema.get('additionalProperties', False)
+
+    def validate(value: Any, where: str) -> List[str]:
+        if expected and (not isinstance(value, expected) or (isinstance(value, bool) and type_name in ('integer', 'number'))):
+            return [f"{where}: expected {type_name}"]
+        if enum is not None and value not in enum:
+            return [f"{where}: must be one of {enum}"]
+        errors = []
+        if isinstance(value, dict):
+            for k in required:
+                if value.get(k) is None:
+                    errors.append(f"{where}.{k}: required")
+            if closed:
+                errors.extend(f"{where}.{k}: unknown property" for k in value if k not in props)
+            for k, check in props.items():
+                if value.get(k) is not None:
+                    errors.extend(check(value[k], f"{where}.{k}"))
+        if items and isinstance(value, list):
+            for i, v in enumerate(value):
+                errors.extend(items(v, f"{where}[{i}]"))
+        return errors
+
+    return validate
+
+tools_by_name: Dict[str, dict] = {}
+tool_validators: Dict[str, Callable[[Any, str], List[str]]] = {}
+TOOLS_LIST_RESULT: Dict[str, Any] = {}
+TOOLS_LIST_BYTES = b''
+
+def build_tool_registry():
+    global TOOLS_LIST_RESULT, TOOLS_LIST_BYTES
+    tools_by_name.clear()
+    tool_validators.clear()
+    for t in tools_list:
+        tools_by_name[t["name"]] = t
+        tool_validators[t["name"]] = compile_schema(t["inputSchema"])
+    TOOLS_LIST_RESULT = {"tools": [{k: v for k, v in t.items() if k != 'handler'} for t in tools_list]}
+    TOOLS_LIST_BYTES = json_dumps_bytes(TOOLS_LIST_RESULT)
+
+def validate_tool_args(name: str, args: Any) -> List[str]:
+    if not isinstance(args, dict):
+        return ["arguments: expected object"]
+    return tool_validators[name](args, "arguments")
+
+build_tool_registry()
 
 # ===== API Endpoints =====
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    background = [asyncio.create_task(f5_clients.run_reaper())]
+    if shared_store:
+        background.append(asyncio.create_task(jobs.watch_cancellations()))
+    try:
+        yield
+    finally:
+        for task in background:
+            task.cancel()
+        await jobs.cancel_all()
+        await stats_collector.stop_all()
+        await f5_clients.close_all()
+        if log_queue_handler.dropped:
+            logger.warning(f"Dropped {log_queue_handler.dropped} log records under load")
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+
 @app.middleware("http")
 async def log_middleware(request: Request, call_next):
-    if ENABLE_CLIENT_LOG:
-        body = await request.body()
-        # Log the request
-        log_request("MCP", request.method, request.url.path, body.decode() if body else None)
-    
+    if not ENABLE_CLIENT_LOG or request.url.path == "/metrics":
+        return await call_next(request)
+
+    body = await request.body()
+    log_request("MCP", request.method, request.url.path, body)
+
     response = await call_next(request)
-    
-    # 1. Consume the response body entirely to log it
-    response_body = [chunk async for chunk in response.body_iterator]
-    
-    # 2. Re-create an ASYNC iterator for the response to use
-    async def async_iterator():
-        for chunk in response_body:
-            yield chunk
-            
-    # Assign the async iterator back to the response
-    response.body_iterator = async_iterator()
-    
-    if ENABLE_CLIENT_LOG:
-        # Decode and log the response body
+
+    # Log a bounded preview as chunks pass through; the body is never buffered
+    async def logged_iterator(body_iterator):
+        preview = bytearray()
+        total = 0
         try:
-            body_content = b"".join(response_body).decode()
-        except Exception:
-            body_content = "<binary or non-utf8 content>"
-            
-        log_response("MCP", response.status_code, body_content)
-        
+            async for chunk in body_iterator:
+                total += len(chunk)
+                if len(preview) < LOG_BODY_MAX_BYTES:
+                    preview += chunk[:LOG_BODY_MAX_BYTES - len(preview)]
+                yield chunk
+        finally:
+            log_response("MCP", response.status_code, preview, total)
+
+    response.body_iterator = logged_iterator(response.body_iterator)
     return response
 
+def collect_runtime_metrics():
+    cache = read_cache.stats()
+    lookups = cache["hits"] + cache["misses"]
+    f5_read_cache_hits.set(value=cache["hits"])
+    f5_read_cache_misses.set(value=cache["misses"])
+    f5_read_cache_hit_ratio.set(value=cache["hits"] / lookups if lookups else 0.0)
+    f5_read_cache_bytes.set(value=cache["bytes"])
+    f5_singleflight_coalesced.set(value=f5_singleflight.coalesced)
+    queued: Dict[str, int] = {}
+    circuit_open: Dict[str, int] = {}
+    for url, gate in f5_gates.items():
+        device = f5_device_label(url)
+        queued[device] = queued.get(device, 0) + gate.limiter.queued
+        circuit_open[device] = max(circuit_open.get(device, 0), 0 if gate.state == "closed" else 1)
+    for device in queued:
+        f5_device_queued.set(device, value=queued[device])
+        f5_device_circuit_open.set(device, value=circuit_open[device])
+    for status, count in jobs.stats().items():
+        mcp_jobs.set(status, value=count)
+
+metrics.collectors.append(collect_runtime_metrics)
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/mcp/stats")
+async def mcp_stats():
+    return {
+        "singleflight": f5_singleflight.stats(),
+        "read_cache": read_cache.stats(),
+        "devices": {url: gate.stats() for url, gate in f5_gates.items()},
+        "jobs": jobs.stats(),
+        "config_index": config_index.stats(),
+        "cert_index": cert_index.stats(),
+    }
+
 @app.post("/mcp/list-tools")
 async def mcp_list_tools():
-    # Remove handler from output
-    tools_output = []
-    for t in tools_list:
-        t_copy = t.copy()
-        del t_copy['handler']
-        tools_output.append(t_copy)
-    return {"tools": tools_output}
+    return Response(content=TOOLS_LIST_BYTES, media_type="application/json")
+
+async def call_tool_handler(name: str, args: dict, transport: str):
+    # A dry run only reads the config index, so it is answered inline
+    if args.get('async') and not args.get('dry_run') and name in JOB_TOOLS:
+        job_args = {k: v for k, v in args.items() if k != 'async'}
+        job = jobs.submit(name, lambda: call_tool_handler(name, job_args, "job"))
+        mcp_tool_calls.inc(name, transport, "queued")
+        return {'content': [{'type': 'text', 'text': f"OK job {job['id']} queued for {name}; poll getJobStatus with this job_id"}]}
+
+    mcp_tools_in_flight.inc()
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        result = await tools_by_name[name]["handler"](args)
+        outcome = "ok"
+        return result
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    finally:
+        mcp_tools_in_flight.dec()
+        mcp_tool_duration.observe(time.perf_counter() - started, name)
+        mcp_tool_calls.inc(name, transport, outcome)
 
 @app.post("/mcp/invoke")
 async def mcp_invoke(request: Request):
-    data = await request.json()
+    data = json_loads(await request.body())
     name = data.get("name") or data.get("params", {}).get("name")
     args = data.get("arguments") or data.get("params", {}).get("arguments") or {}
     
-    tool = next((t for t in tools_list if t["name"] == name), None)
+    tool = tools_by_name.get(name)
     if not tool:
-        return JSONResponse(status_code=400, content={"error": f"Unknown tool: {name}"})
+        return FastJSONResponse(status_code=400, content={"error": f"Unknown tool: {name}"})
+
+    errors = validate_tool_args(name, args)
+    if errors:
+        mcp_tool_calls.inc(name, "http", "invalid")
+        return FastJSONResponse(status_code=400, content={"error": f"Invalid arguments for {name}: {'; '.join(errors)}"})
     
+    if wants_event_stream(request):
+        async def work():
+            try:
+                return sse_event(await call_tool_handler(name, args, "http"), "result")
+            except Exception as e:
+                logger.error(f"Error invoking {name}: {e}")
+                return sse_event({"content": [{"type": "text", "text": f"error {str(e)}"}]}, "error")
+        return StreamingResponse(stream_with_progress(request, work, lambda p: sse_event(p, "progress")), media_type="text/event-stream")
+
     try:
-        result = await tool["handler"](args)
+        result = await call_tool_handler(name, args, "http")
         return result
     except Exception as e:
         logger.error(f"Error invoking {name}: {e}")
-        return JSONResponse(status_code=500, content={"content": [{"type": "text", "text": f"error {str(e)}"}]})
+        return FastJSONResponse(status_code=500, content={"content": [{"type": "text", "text": f"error {str(e)}"}]})
 
-@app.post("/")
-async def json_rpc_handler(request: Request):
-    data = await request.json()
+TOOLS_LIST_METHODS = ("mcp:list-tools", "tools/list")
+TOOLS_CALL_METHODS = ("tools/invoke", "mcp:invoke", "tools/call", "mcp:call-tool")
+JSONRPC_METHODS = ("initialize", "ping", "notifications/cancelled") + TOOLS_LIST_METHODS + TOOLS_CALL_METHODS
+
+async def dispatch_jsonrpc(data: Any) -> Optional[dict]:
+    if not isinstance(data, dict) or not isinstance(data.get("method"), str):
+        return {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Invalid Request"}}
+
+    # Requests without an id are notifications: run them, but never answer
+    is_notification = "id" not in data
+    try:
+        response = await _handle_jsonrpc_method(data)
+    except Exception as e:
+        logger.error(f"Error handling {data.get('method')}: {e}")
+        response = {"jsonrpc": "2.0", "id": data.get("id"), "error": {"code": -32603, "message": str(e)}}
+    return None if is_notification else response
+
+async def _handle_jsonrpc_method(data: dict) -> dict:
     method = data.get("method")
-    params = data.get("params", {})
+    params = data.get("params") or {}
     jsonrpc_id = data.get("id")
+    mcp_jsonrpc_requests.inc(method if method in JSONRPC_METHODS else "other")
     
     if method == "initialize":
         return {
@@ -589,24 +3473,36 @@ async def json_rpc_handler(request: Request):
             }
         }
     
-    if method in ["mcp:list-tools", "tools/list"]:
-        tools_output = [{k:v for k,v in t.items() if k != 'handler'} for t in tools_list]
-        return {"jsonrpc": "2.0", "id": jsonrpc_id, "result": {"tools": tools_output}}
+    if method in TOOLS_LIST_METHODS:
+        return {"jsonrpc": "2.0", "id": jsonrpc_id, "result": TOOLS_LIST_RESULT}
         
-    if method in ["tools/invoke", "mcp:invoke", "tools/call", "mcp:call-tool"]:
+    if method in TOOLS_CALL_METHODS:
         name = params.get("name")
         args = params.get("arguments", {})
         
-        tool = next((t for t in tools_list if t["name"] == name), None)
+        tool = tools_by_name.get(name)
         if not tool:
             return {
                 "jsonrpc": "2.0", "id": jsonrpc_id,
                 "error": {"code": -32601, "message": f"Unknown tool: {name}"}
             }
+
+        errors = validate_tool_args(name, args)
+        if errors:
+            mcp_tool_calls.inc(name, "jsonrpc", "invalid")
+            return {
+                "jsonrpc": "2.0", "id": jsonrpc_id,
+                "error": {"code": -32602, "message": f"Invalid params: {'; '.join(errors)}"}
+            }
         
         try:
-            result = await tool["handler"](args)
+            result = await run_cancellable(jsonrpc_id, call_tool_handler(name, args, "jsonrpc"))
             return {"jsonrpc": "2.0", "id": jsonrpc_id, "result": result}
+        except RequestCancelledError as e:
+            return {
+                "jsonrpc": "2.0", "id": jsonrpc_id,
+                "error": {"code": -32800, "message": str(e)}
+            }
         except Exception as e:
             return {
                 "jsonrpc": "2.0", "id": jsonrpc_id,
@@ -616,23 +3512,169 @@ async def json_rpc_handler(request: Request):
     if method == "ping":
         return {"jsonrpc": "2.0", "id": jsonrpc_id, "result": {}}
 
+    if method == "notifications/cancelled":
+        cancelled = cancel_jsonrpc_request(params.get("requestId"))
+        return {"jsonrpc": "2.0", "id": jsonrpc_id, "result": {"cancelled": cancelled}}
+
     return {
         "jsonrpc": "2.0", "id": jsonrpc_id,
         "error": {"code": -32601, "message": f"Method not found: {method}"}
     }
 
+async def dispatch_jsonrpc_batch(batch: list) -> List[dict]:
+    sem = asyncio.Semaphore(JSONRPC_BATCH_CONCURRENCY)
+
+    async def run(item):
+        async with sem:
+            return await dispatch_jsonrpc(item)
+
+    responses = await asyncio.gather(*[run(item) for item in batch])
+    return [r for r in responses if r is not None]
+
+def http_jsonrpc_session(request: Request) -> str:
+    # Mcp-Session-Id (issued on initialize) when the client sends it, otherwise the connection itself
+    session = request.headers.get('mcp-session-id')
+    if session:
+        return f"session:{session}"
+    client = request.client
+    return f"conn:{client.host}:{client.port}" if client else f"request:{id(request)}"
+
+@app.post("/")
+async def json_rpc_handler(request: Request):
+    try:
+        data = json_loads(await request.body())
+    except ValueError:
+        return {"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": "Parse error"}}
+    session = http_jsonrpc_session(request)
+    jsonrpc_session.set(session)
+
+    if isinstance(data, list):
+        if not data:
+            return {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Invalid Request: empty batch"}}
+        responses = await dispatch_jsonrpc_batch(data)
+        # A batch made only of notifications gets no body back
+        return responses if responses else Response(status_code=202)
+
+    # Streamable HTTP: a single tools/call is answered as an event stream of progress
+    # notifications followed by the response when the client accepts one
+    if isinstance(data, dict) and data.get("method") in TOOLS_CALL_METHODS and "id" in data and wants_event_stream(request):
+        params = data.get("params") if isinstance(data.get("params"), dict) else {}
+        token = (params.get("_meta") or {}).get("progressToken")
+
+        def progress_event(p: dict) -> Optional[bytes]:
+            if token is None:
+                return None
+            return sse_event({"jsonrpc": "2.0", "method": "notifications/progress", "params": dict(p, progressToken=token)})
+
+        async def work():
+            jsonrpc_session.set(session)
+            return sse_event(await dispatch_jsonrpc(data))
+        return StreamingResponse(stream_with_progress(request, work, progress_event), media_type="text/event-stream")
+
+    if isinstance(data, dict) and data.get("method") in TOOLS_LIST_METHODS and "id" in data:
+        mcp_jsonrpc_requests.inc(data["method"])
+        body = b'{"jsonrpc":"2.0","id":' + json_dumps_bytes(data["id"]) + b',"result":' + TOOLS_LIST_BYTES + b'}'
+        return Response(content=body, media_type="application/json")
+
+    response = await dispatch_jsonrpc(data)
+    if response is None:
+        return Response(status_code=202)
+    if isinstance(data, dict) and data.get("method") == "initialize" and "result" in response and not request.headers.get('mcp-session-id'):
+        return FastJSONResponse(content=response, headers={"Mcp-Session-Id": secrets.token_urlsafe(24)})
+    return response
+
+# ===== Stdio Transport =====
+# Newline-delimited JSON-RPC on stdin/stdout for MCP clients that spawn the server; logs stay on stderr
+
+async def serve_stdio():
+    loop = asyncio.get_running_loop()
+    out = sys.stdout.buffer
+    pending: set = set()
+
+    def write(message: Any):
+        out.write(json_dumps_bytes(message) + b"\n")
+        out.flush()
+
+    async def handle(line: bytes):
+        try:
+            data = json_loads(line)
+        except ValueError:
+            write({"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": "Parse error"}})
+            return
+        if isinstance(data, list):
+            if not data:
+                write({"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Invalid Request: empty batch"}})
+                return
+            responses = await dispatch_jsonrpc_batch(data)
+            if responses:
+                write(responses)
+            return
+        params = data.get("params") if isinstance(data, dict) and isinstance(data.get("params"), dict) else {}
+        token = (params.get("_meta") or {}).get("progressToken")
+        if token is not None:
+            progress_reporter.set(lambda p: write({"jsonrpc": "2.0", "method": "notifications/progress", "params": dict(p, progressToken=token)}))
+        response = await dispatch_jsonrpc(data)
+        if response is not None:
+            write(response)
+
+    # One client per process: the whole stream is a single session
+    jsonrpc_session.set("stdio")
+    async with lifespan(app):
+        while True:
+            line = await loop.run_in_executor(None, sys.stdin.buffer.readline)
+            if not line:
+                break
+            if not line.strip():
+                continue
+            # Each message runs on its own task so a slow tools/call never blocks notifications/cancelled
+            task = asyncio.create_task(handle(line))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        if pending:
+            await asyncio.wait(pending)
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="F5 MCP Server")
     parser.add_argument("--port", type=int, default=3000, help="Port to run server on")
+    parser.add_argument("--stdio", action="store_true", help="Serve JSON-RPC on stdin/stdout instead of HTTP")
+    parser.add_argument("--workers", type=int, default=1, help="HTTP worker processes (tokens, cached reads and jobs are shared)")
+    parser.add_argument("--shared-store", help="sqlite file shared by --workers (default: a private temp file)")
     args = parser.parse_args()
-    
+    if args.stdio and args.workers > 1:
+        parser.error("--stdio and --workers are mutually exclusive")
+
+    if args.stdio:
+        print("OK, MCP Server running on stdio", file=sys.stderr)
+        try:
+            asyncio.run(serve_stdio())
+        except KeyboardInterrupt:
+            pass
+        sys.exit(0)
+
     port = args.port
     # Handle PORT env var if set
     if os.environ.get("PORT"):
         port = int(os.environ.get("PORT"))
-        
+
+    store_dir = None
+    if args.workers > 1:
+        # Workers import this module afresh, so shared settings travel through the environment
+        if not args.shared_store:
+            # Removed on exit: the store holds live device tokens
+            store_dir = tempfile.TemporaryDirectory(prefix="f5mcp-")
+        os.environ["F5MCP_SHARED_STORE"] = args.shared_store or os.path.join(store_dir.name, "shared.sqlite3")
+        os.environ.setdefault("F5MCP_CREDENTIAL_SALT", os.urandom(16).hex())
+        os.environ["F5MCP_WORKERS"] = str(args.workers)
+        target = f"{os.path.splitext(os.path.basename(__file__))[0]}:app"
+    else:
+        target = app
+
     print(f"OK, MCP Server running on port {port}")
     try:
-        uvicorn.run(app, host="0.0.0.0", port=port)
+        uvicorn.run(target, host="0.0.0.0", port=port, workers=args.workers,
+                    app_dir=os.path.dirname(os.path.abspath(__file__)))
     except Exception as e:
-        print(f"Failed to start server: {e}")
\ No newline at end of file
+        print(f"Failed to start server: {e}")
+    finally:
+        if store_dir:
+            store_dir.cleanup()
\ No newline at end of file